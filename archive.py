@@ -0,0 +1,227 @@
+import json
+import sqlite3
+import zlib
+
+ARCHIVE_BATCH_ROWS = 5000  # Entries moved per write transaction
+ARCHIVE_CHUNK_ROWS = 200  # Entries per compressed chunk
+
+# Archiving goes by id so archived entries are always older than live ones,
+# which lets history pages run off the end of reputation into the archive
+CUTOFF_ID_SQL = "SELECT MAX(id) FROM reputation WHERE created_at < ?"
+OLDEST_ROWS_SQL = """
+    SELECT id, target_user_id, author_user_id, point_value, reason, created_at
+    FROM reputation
+    WHERE id <= ?
+    ORDER BY id
+    LIMIT ?
+"""
+INSERT_CHUNK_SQL = """
+    INSERT INTO reputation_archive (target_user_id, first_id, last_id, row_count, data)
+    VALUES (?, ?, ?, ?, ?)
+"""
+ROLLUP_TOTALS_SQL = """
+    INSERT INTO archive_totals (
+        user_id, total_points, positive_count, negative_count, entry_count, decayed_points
+    )
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (user_id) DO UPDATE SET
+        total_points = total_points + excluded.total_points,
+        positive_count = positive_count + excluded.positive_count,
+        negative_count = negative_count + excluded.negative_count,
+        entry_count = entry_count + excluded.entry_count,
+        decayed_points = decayed_points + excluded.decayed_points
+"""
+ROLLUP_PAIRS_SQL = """
+    INSERT INTO archive_pairs (target_user_id, author_user_id, positive_count)
+    VALUES (?, ?, ?)
+    ON CONFLICT (target_user_id, author_user_id)
+    DO UPDATE SET positive_count = positive_count + excluded.positive_count
+"""
+# While this row exists the totals delete trigger stands down (migration 9).
+# It only ever exists inside an archiving transaction.
+START_ARCHIVING_SQL = "INSERT INTO settings (key, value) VALUES ('archiving', 1)"
+STOP_ARCHIVING_SQL = "DELETE FROM settings WHERE key = 'archiving'"
+DELETE_ARCHIVED_SQL = "DELETE FROM reputation WHERE id BETWEEN ? AND ?"
+# Every id up to this one is archived or gone, imports skip them
+SET_ARCHIVED_UP_TO_SQL = (
+    "INSERT INTO settings (key, value) VALUES ('archived_up_to', ?) "
+    "ON CONFLICT (key) DO UPDATE SET value = excluded.value"
+)
+ARCHIVED_UP_TO_SQL = "SELECT value FROM settings WHERE key = 'archived_up_to'"
+# Chunks of one user never overlap, so first_id order is also last_id order
+USER_CHUNKS_SQL = """
+    SELECT data FROM reputation_archive
+    WHERE target_user_id = ? AND first_id < ?
+    ORDER BY first_id DESC
+"""
+ALL_CHUNKS_SQL = "SELECT target_user_id, data FROM reputation_archive ORDER BY id"
+ARCHIVED_COUNT_SQL = "SELECT entry_count FROM archive_totals WHERE user_id = ?"
+CHUNK_SQL = "SELECT data FROM reputation_archive WHERE id = ?"
+ALL_CHUNK_IDS_SQL = "SELECT id, target_user_id, data FROM reputation_archive ORDER BY id"
+INSERT_ENTRY_SQL = """
+    INSERT INTO archive_entries (id, chunk_id, target_user_id, author_user_id, point_value)
+    VALUES (?, ?, ?, ?, ?)
+"""
+INDEX_TEXT_SQL = "INSERT INTO archive_fts (rowid, reason) VALUES (?, ?)"
+# Set by migration 12 when chunks predate archive_entries and archive_fts
+INDEX_PENDING_SQL = "SELECT 1 FROM settings WHERE key = 'index_archive'"
+INDEX_DONE_SQL = "DELETE FROM settings WHERE key = 'index_archive'"
+# Archived entries the bulk deletes can't reach, counted for their reports
+ARCHIVED_IDS_SQL = (
+    "SELECT COUNT(*) FROM archive_entries WHERE id IN (SELECT value FROM json_each(?))"
+)
+ARCHIVED_ID_RANGE_SQL = "SELECT COUNT(*) FROM archive_entries WHERE id BETWEEN ? AND ?"
+ARCHIVED_BY_AUTHOR_SQL = "SELECT COUNT(*) FROM archive_entries WHERE author_user_id = ?"
+ARCHIVED_BETWEEN_SQL = (
+    "SELECT COUNT(*) FROM archive_entries "
+    "WHERE (target_user_id = ? AND author_user_id = ?) "
+    "OR (target_user_id = ? AND author_user_id = ?)"
+)
+SET_ARCHIVED_DECAYED_SQL = "UPDATE archive_totals SET decayed_points = ? WHERE user_id = ?"
+
+
+def encode(entries) -> bytes:
+    return zlib.compress(json.dumps(entries, separators=(",", ":")).encode(), 9)
+
+
+def decode(data: bytes) -> list:
+    # [id, point_value, reason, author_user_id, created_at], newest first
+    return json.loads(zlib.decompress(data))
+
+
+def cutoff_id(connection: sqlite3.Connection, before: float) -> int | None:
+    # Newest entry created before the given unix time, None if there is none
+    return connection.execute(CUTOFF_ID_SQL, (before,)).fetchone()[0]
+
+
+def archive_batch(connection: sqlite3.Connection, cutoff: int, weight) -> int:
+    # Moves up to ARCHIVE_BATCH_ROWS of the oldest entries with id <= cutoff
+    # into compressed per-user chunks and rolls them up. weight is the decay
+    # weight function (DecayClock.weight). Returns how many entries moved.
+    rows = connection.execute(OLDEST_ROWS_SQL, (cutoff, ARCHIVE_BATCH_ROWS)).fetchall()
+    if not rows:
+        return 0
+
+    by_target = {}
+    for row in rows:
+        by_target.setdefault(row[1], []).append(row)
+
+    chunks = []  # (target_user_id, first_id, last_id, row_count, data, stored entries)
+    totals = []
+    pairs = {}
+    for target_user_id, entries in by_target.items():
+        entries.reverse()  # Newest first, same as history pages
+        for start in range(0, len(entries), ARCHIVE_CHUNK_ROWS):
+            chunk = entries[start : start + ARCHIVE_CHUNK_ROWS]
+            # Stored as (id, point_value, reason, author_user_id, created_at)
+            stored = [(row[0], row[3], row[4], row[2], row[5]) for row in chunk]
+            chunks.append(
+                (target_user_id, chunk[-1][0], chunk[0][0], len(chunk), encode(stored), stored)
+            )
+
+        points = [entry[3] for entry in entries]
+        totals.append(
+            (
+                target_user_id,
+                sum(points),
+                sum(point > 0 for point in points),
+                sum(point < 0 for point in points),
+                len(entries),
+                sum(entry[3] * weight(entry[5]) for entry in entries),
+            )
+        )
+        for entry in entries:
+            if entry[3] > 0:
+                pair = (target_user_id, entry[2])
+                pairs[pair] = pairs.get(pair, 0) + 1
+
+    for *chunk, stored in chunks:
+        chunk_id = connection.execute(INSERT_CHUNK_SQL, chunk).lastrowid
+        index_chunk(connection, chunk_id, chunk[0], stored)
+    connection.executemany(ROLLUP_TOTALS_SQL, totals)
+    connection.executemany(
+        ROLLUP_PAIRS_SQL, [(*pair, count) for pair, count in pairs.items()]
+    )
+
+    # rows are every live entry from the first id to the last, in order
+    connection.execute(START_ARCHIVING_SQL)
+    connection.execute(DELETE_ARCHIVED_SQL, (rows[0][0], rows[-1][0]))
+    connection.execute(STOP_ARCHIVING_SQL)
+    connection.execute(SET_ARCHIVED_UP_TO_SQL, (rows[-1][0],))
+    return len(rows)
+
+
+def index_chunk(connection: sqlite3.Connection, chunk_id: int, target_user_id: int, entries):
+    # Makes one chunk's entries reachable by search and the bulk deletes.
+    # entries are stored chunk entries, (id, point_value, reason, author_user_id, created_at).
+    connection.executemany(
+        INSERT_ENTRY_SQL,
+        [(entry[0], chunk_id, target_user_id, entry[3], entry[1]) for entry in entries],
+    )
+    connection.executemany(INDEX_TEXT_SQL, [(entry[0], entry[2]) for entry in entries])
+
+
+def index_pending_chunks(connection: sqlite3.Connection) -> int:
+    # Indexes chunks archived before migration 12, once. Returns how many.
+    if connection.execute(INDEX_PENDING_SQL).fetchone() is None:
+        return 0
+
+    count = 0
+    for chunk_id, target_user_id, data in connection.execute(ALL_CHUNK_IDS_SQL):
+        index_chunk(connection, chunk_id, target_user_id, decode(data))
+        count += 1
+    connection.execute(INDEX_DONE_SQL)
+    return count
+
+
+def archived_reason(connection: sqlite3.Connection, chunk_id: int, entry_id: int) -> str:
+    (data,) = connection.execute(CHUNK_SQL, (chunk_id,)).fetchone()
+    for entry in decode(data):
+        if entry[0] == entry_id:
+            return entry[2]
+    return ""
+
+
+def archived_up_to(connection: sqlite3.Connection) -> int:
+    row = connection.execute(ARCHIVED_UP_TO_SQL).fetchone()
+    return row[0] if row else 0
+
+
+def history_page(connection: sqlite3.Connection, user_id: int, before_id: int, limit: int):
+    # Archived part of a history page: (id, point_value, reason, author_user_id)
+    # with id < before_id, newest first. Stops decompressing once it has enough.
+    entries = []
+    cursor = connection.execute(USER_CHUNKS_SQL, (user_id, before_id))
+    for (data,) in cursor:
+        for entry in decode(data):
+            if entry[0] < before_id:
+                entries.append(tuple(entry[:4]))
+                if len(entries) == limit:
+                    cursor.close()
+                    return entries
+    return entries
+
+
+def archived_count(connection: sqlite3.Connection, user_id: int) -> int:
+    row = connection.execute(ARCHIVED_COUNT_SQL, (user_id,)).fetchone()
+    return row[0] if row else 0
+
+
+def iter_entries(connection: sqlite3.Connection):
+    # Every archived entry as (id, target_user_id, author_user_id, point_value,
+    # reason, created_at), one chunk in memory at a time
+    for target_user_id, data in connection.execute(ALL_CHUNKS_SQL):
+        for entry_id, points, reason, author_user_id, created_at in decode(data):
+            yield entry_id, target_user_id, author_user_id, points, reason, created_at
+
+
+def recompute_decayed(connection: sqlite3.Connection, weight):
+    # Re-weights archived entries after the decay half-life changed
+    decayed = {}
+    for entry in iter_entries(connection):
+        decayed[entry[1]] = decayed.get(entry[1], 0.0) + entry[3] * weight(entry[5])
+
+    connection.executemany(
+        SET_ARCHIVED_DECAYED_SQL,
+        [(points, user_id) for user_id, points in decayed.items()],
+    )
@@ -1,81 +1,52 @@
 import discord
 from discord.ext import commands
+from model.autoreplies import AUTOREPLIES, FileEmbed, build_autoreply_embed
 from model.rules import make_rule_embed
 
 OWNER_ID = 923600698967461898
 
 
-class Autoreply(commands.Cog):
-    def __init__(self, client: commands.Bot):
-        self.client = client
-
-    @commands.command(
-        name="customot", description="Display CustomOT Tutorial", aliases=["cot"]
-    )
-    async def custom_ot(self, context: commands.Context, user: discord.Member = None):
-        embed = discord.Embed(
-            title="How To Make a Custom OT Pokemon",
-            color=0x237FEB,
-            description="1. To customize the original trainer name or OT, the Pokemon needs to be in Pokemon Go. \n2. You must then change your Pokemon Home name on the mobile app to whatever OT you require. \n\nNote: It is recommended to restart Pokemon Go after this before transferring as Pokemon Home may be slow to register any changes.",
-        )
+def make_autoreply_command(autoreply: dict) -> commands.Command:
+    embed = build_autoreply_embed(autoreply)  # Built once, reused on every call
 
+    async def reply(context: commands.Context, user: discord.Member = None):
         await context.reply(content=user.mention if user else "", embed=embed)
 
-    @commands.command(
-        name="stamp",
-        description="Display Difference Between Pokemon Go Stamp and Pokemon Go Origin Marker",
+    return commands.Command(
+        reply,
+        name=autoreply["name"],
+        description=autoreply["description"],
+        aliases=autoreply.get("aliases", []),
     )
-    async def stamp(self, context: commands.Context, user: discord.Member = None):
-        embed = discord.Embed(
-            title="The Pokemon Go Stamp and Pokemon Go Origin Marker are NOT the same.",
-            color=0x237FEB,
-            description="The stamp shows the game that the pokemon was last in before being transferred to home.\nThis is important because pokemon cannot obtain the stamp once lost, but hacked pokemon **may** have the origin marker.",
-        )
-        embed.set_image(url="https://i.imgur.com/PZKnD5p.jpg")
 
-        await context.reply(content=user.mention if user else "", embed=embed)
 
-    @commands.command(
-        name="crosspost", description="Warns users not to crosspost", aliases=["crossp"]
-    )
-    async def crosspost(self, context: commands.Context, user: discord.Member = None):
-        embed = discord.Embed(
-            title="❗️Do not post your request in more than one channel",
-            color=0x237FEB,
-            description="Please give it some time before requesting again depending on the length of your demand.\n\n*Refrain from crossposting again. Thank you for understanding.*",
+class Autoreply(commands.Cog):
+    def __init__(self, client: commands.Bot):
+        self.client = client
+        self.autoreply_commands = [
+            make_autoreply_command(autoreply) for autoreply in AUTOREPLIES
+        ]
+        self.guideline_embeds = [
+            FileEmbed(
+                "model/trade_guidelines.txt", "Trade Guidelines", discord.Color.red()
+            ),
+            FileEmbed(
+                "model/trade_guidelines_special.txt", "Special Cases", discord.Color.red()
+            ),
+        ]
+        self.accreditation_embed = discord.Embed(
+            color=discord.Color.green(),
+            title="Courtesy Of",
+            description="This guide was brought to you by <@558440155397095455>",
         )
 
-        await context.reply(content=user.mention if user else "", embed=embed)
-
-    @commands.command(
-        name="tradechannels",
-        description="Tells users where the trade channels are",
-        aliases=["tc"],
-    )
-    async def tradechannels(
-        self, context: commands.Context, user: discord.Member = None
-    ):
-        info_text = """Click below and please repost your request in one of the following locations:
-
-Trade Hub 1: <#1341162683734425631>
-Trade Hub 2: <#1341162764701536398>
-Shiny Trade: <#1047110840735768636>
-
-Alternatively, For different games, we have the following:
-
-Legends ZA: <#1428946618392252416>
-Legends Arceus: <#1070473675289133116>
-Brilliant Diamond/Shining Pearl: <#1070473596302012507>
-Sword and Shield: <#1070427983367651348>
-Pokemon Let's Go: <#1070473752695021598>"""
-
-        embed = discord.Embed(
-            title="❗️ This is not a trade channel",
-            color=0x237FEB,
-            description=info_text,
-        )
+    async def cog_load(self):
+        for command in self.autoreply_commands:
+            self.client.add_command(command)
 
-        await context.reply(content=user.mention if user else "", embed=embed)
+    async def cog_unload(self):
+        for command in self.autoreply_commands:
+            self.client.remove_command(command.name)
 
     @commands.command()
     async def rule(self, context: commands.Context, number: int | None):
@@ -93,31 +64,9 @@ Pokemon Let's Go: <#1070473752695021598>"""
             await context.reply("Nope!")
             return  # Get out early if not me
 
-        with open("model/trade_guidelines.txt", "r") as f:
-            first_half_data = "\n".join([i.strip() for i in f.readlines()])
-
-        with open("model/trade_guidelines_special.txt", "r") as f:
-            second_half_data = "\n".join([i.strip() for i in f.readlines()])
-
-        first_half_embed = discord.Embed(
-            color=discord.Color.red(),
-            title="Trade Guidelines",
-            description=first_half_data,
-        )
-        second_half_embed = discord.Embed(
-            color=discord.Color.red(),
-            title="Special Cases",
-            description=second_half_data,
-        )
-
-        accredation = discord.Embed(
-            color=discord.Color.green(),
-            title="Courtesy Of",
-            description="This guide was brought to you by <@558440155397095455>",
-        )
-
         await context.channel.send(
-            embeds=[first_half_embed, second_half_embed, accredation]
+            embeds=[embed.get() for embed in self.guideline_embeds]
+            + [self.accreditation_embed]
         )
 
 
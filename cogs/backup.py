@@ -0,0 +1,124 @@
+import os
+import time
+
+import discord
+from discord.ext import commands
+from discord import app_commands
+from db import ARCHIVE_AFTER_DAYS, AsyncDB
+
+OWNER_ID = 923600698967461898
+BACKUP_DIR = "backups"  # On the bot's host, next to points.db
+
+
+class Backup(commands.Cog):
+    def __init__(self, client: commands.Bot):
+        self.client = client
+
+    def output_path(self, prefix: str, guild_id: int, extension: str) -> str:
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        return os.path.join(BACKUP_DIR, f"{prefix}-{guild_id}-{stamp}.{extension}")
+
+    @app_commands.guild_only()
+    @app_commands.command(
+        name="backup_db", description="Snapshot this server's database on the host, this command is not for you"
+    )
+    async def backup_db(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+
+        if interaction.user.id != OWNER_ID:
+            await interaction.followup.send("This command is not for you.")
+            return
+
+        path = self.output_path("points", interaction.guild_id, "db")
+        size = await AsyncDB.backup_database(interaction.guild_id, path)
+        await interaction.followup.send(
+            f"Wrote a {size / 1_000_000:.1f}MB snapshot to `{path}`."
+        )
+
+    @app_commands.guild_only()
+    @app_commands.command(
+        name="export_reputation",
+        description="Export this server's reputation entries on the host, this command is not for you",
+    )
+    @app_commands.choices(
+        format=[
+            app_commands.Choice(name="NDJSON", value="ndjson"),
+            app_commands.Choice(name="CSV", value="csv"),
+        ]
+    )
+    async def export_reputation(
+        self, interaction: discord.Interaction, format: str = "ndjson"
+    ):
+        await interaction.response.defer(ephemeral=True)
+
+        if interaction.user.id != OWNER_ID:
+            await interaction.followup.send("This command is not for you.")
+            return
+
+        path = self.output_path("reputation", interaction.guild_id, format)
+        count = await AsyncDB.export_reputation(interaction.guild_id, path, format)
+        await interaction.followup.send(f"Exported {count} entries to `{path}`.")
+
+    @app_commands.guild_only()
+    @app_commands.command(
+        name="import_reputation",
+        description="Import reputation entries into this server from a file on the host, this command is not for you",
+    )
+    @app_commands.describe(
+        path="NDJSON or CSV file on the host, CSV is picked by the .csv extension"
+    )
+    async def import_reputation(self, interaction: discord.Interaction, path: str):
+        await interaction.response.defer(ephemeral=True)
+
+        if interaction.user.id != OWNER_ID:
+            await interaction.followup.send("This command is not for you.")
+            return
+
+        if not os.path.isfile(path):
+            await interaction.followup.send(f"`{path}` does not exist.")
+            return
+
+        try:
+            count, skipped = await AsyncDB.import_reputation(
+                interaction.guild_id, path
+            )
+        except ValueError as error:
+            # Batches before the bad line are already committed
+            await interaction.followup.send(f"Import stopped: {error}")
+            return
+
+        await interaction.followup.send(
+            f"Imported {count} entries, skipped {skipped} already present."
+        )
+
+    @app_commands.guild_only()
+    @app_commands.command(
+        name="archive_reputation",
+        description="Compress old reputation entries into the archive, this command is not for you",
+    )
+    @app_commands.describe(
+        older_than_days=f"Archive entries older than this (default {ARCHIVE_AFTER_DAYS})"
+    )
+    async def archive_reputation(
+        self,
+        interaction: discord.Interaction,
+        older_than_days: app_commands.Range[int, 1] = ARCHIVE_AFTER_DAYS,
+    ):
+        await interaction.response.defer(ephemeral=True)
+
+        if interaction.user.id != OWNER_ID:
+            await interaction.followup.send("This command is not for you.")
+            return
+
+        archived, freed = await AsyncDB.archive_reputation(
+            interaction.guild_id, older_than_days
+        )
+        await interaction.followup.send(
+            f"Archived {archived} entries older than {older_than_days} days, "
+            f"freed {freed} database pages."
+        )
+
+
+async def setup(client: commands.Bot):
+    await client.add_cog(Backup(client))
@@ -1,20 +1,41 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-from db import DB, ExperienceType
+from db import AsyncDB, ExperienceType
 from model.leaderboard_paginator import LeaderboardPaginator
 from model.history_paginator import HistoryPaginator, ShowHistoryButton
 from model.reputation_manager import ReputationManager
+from model.search_paginator import SearchPaginator
+from model.trader_ranks import TRADER_RANKS, sync_rank_roles
 
 OWNER_ID = 923600698967461898
 
-TRADER_RANKS = [
-    {"name": "Potential Trader", "required": 5, "role_id": 1484354856352219327},
-    {"name": "Trusted Trader", "required": 15, "role_id": 1058092559773216858},
-    {"name": "Trade Leader", "required": 30, "role_id": 1484356325960978442},
-    {"name": "Elite Trader", "required": 45, "role_id": 1058867257868030012},
-    {"name": "Champion Trader", "required": 100, "role_id": 1484356944822140960},
-]
+# Sliding windows for /reputation as (rate, per seconds), kept across restarts
+REPUTATION_AUTHOR_LIMIT = (1, 300)  # Any reputation from one author in a guild
+REPUTATION_PAIR_LIMIT = (3, 86400)  # Reputation from one author to the same target
+
+
+def reputation_cooldown():
+    # Replaces app_commands.checks.cooldown with the persistent store, raising
+    # the same CommandOnCooldown so the error handler doesn't change
+    async def predicate(interaction: discord.Interaction) -> bool:
+        author_id = interaction.user.id
+        target = interaction.namespace.user
+        limits = [(f"reputation:{author_id}", *REPUTATION_AUTHOR_LIMIT)]
+        if target is not None:
+            limits.append(
+                (f"reputation:{author_id}:{target.id}", *REPUTATION_PAIR_LIMIT)
+            )
+
+        retry_after, limit = await AsyncDB.hit_cooldown(interaction.guild_id, limits)
+        if limit is not None:
+            _, rate, per = limit
+            raise app_commands.CommandOnCooldown(
+                app_commands.Cooldown(rate, per), retry_after
+            )
+        return True
+
+    return app_commands.check(predicate)
 
 
 class Points(commands.Cog):
@@ -25,6 +46,7 @@ class Points(commands.Cog):
     async def hello_test_command(self, interaction: discord.Interaction):
         await interaction.response.send_message("Hello!")
 
+    @app_commands.guild_only()
     @app_commands.command(
         name="setup", description="Initial setup, this command is not for you"
     )
@@ -35,9 +57,25 @@ class Points(commands.Cog):
             await interaction.followup.send("This command is not for you.")
             return
 
-        DB.setup_points_db()
-        await interaction.followup.send("Attempted initial table setup")
+        version = await AsyncDB.setup_points_db(interaction.guild_id)
+        await interaction.followup.send(f"Database schema is at version {version}")
+
+    @app_commands.guild_only()
+    @app_commands.command(
+        name="rebuild_totals",
+        description="Recompute cached reputation totals, this command is not for you",
+    )
+    async def rebuild_totals(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+
+        if interaction.user.id != OWNER_ID:
+            await interaction.followup.send("This command is not for you.")
+            return
+
+        users = await AsyncDB.rebuild_user_totals(interaction.guild_id)
+        await interaction.followup.send(f"Rebuilt reputation totals for {users} users")
 
+    @app_commands.guild_only()
     @app_commands.command(
         name="reputation", description="Add or subtract reputation from a person"
     )
@@ -46,9 +84,7 @@ class Points(commands.Cog):
         experience="The type of experience you had (positive or negative)",
         review="Give some feedback!",
     )
-    @app_commands.checks.cooldown(
-        1, 300, key=lambda interaction: (interaction.guild_id, interaction.user.id)
-    )
+    @reputation_cooldown()
     async def reputation(
         self,
         interaction: discord.Interaction,
@@ -62,7 +98,9 @@ class Points(commands.Cog):
             await interaction.followup.send("You can't give reputation to yourself!")
             return
 
-        DB.add_entry_to_points_db(user.id, interaction.user.id, experience, review)
+        await AsyncDB.add_entry(
+            interaction.guild_id, user.id, interaction.user.id, experience, review
+        )
 
         color = (
             discord.Color.green()
@@ -95,6 +133,7 @@ class Points(commands.Cog):
             )
             raise error
 
+    @app_commands.guild_only()
     @app_commands.command(
         name="check_reputation", description="Check a user's reputation"
     )
@@ -104,15 +143,10 @@ class Points(commands.Cog):
     ):
         await interaction.response.defer()
 
-        db = DB("points.db")
-        cursor = db.get_cursor()
-        cursor.execute(
-            "SELECT point_value, reason, author_user_id FROM reputation WHERE target_user_id = ? ORDER BY id DESC",
-            (user.id,),
+        total_points, _, _, unique_users = await AsyncDB.get_user_totals(
+            interaction.guild_id, user.id
         )
-        rows = cursor.fetchall()
-        total_points = sum(row[0] for row in rows)
-        unique_users = len(set(row[2] for row in rows if row[0] > 0))
+        entry_count = await AsyncDB.get_history_count(interaction.guild_id, user.id)
 
         embed = discord.Embed(
             title=f"{user.display_name}'s Reputation",
@@ -121,14 +155,18 @@ class Points(commands.Cog):
             color=discord.Color.blurple(),
         )
 
-        if not rows:
+        if not entry_count:
             embed.description += "\nNo reputation history yet."
             await interaction.followup.send(embed=embed)
             return
 
-        view = HistoryPaginator(db, rows, user, total_points, unique_users)
+        view = HistoryPaginator(
+            interaction.guild_id, user, total_points, unique_users, entry_count
+        )
+        await view.load_page(0)
         await interaction.followup.send(embed=embed, view=ShowHistoryButton(view))
 
+    @app_commands.guild_only()
     @app_commands.command(
         name="manage_reputation",
         description="View and manually modify a user's reputation (moderator only)",
@@ -145,40 +183,90 @@ class Points(commands.Cog):
             await interaction.followup.send("You are not allowed to use this command.")
             return
 
-        db = DB("points.db")
-
-        view = ReputationManager(db, user)
+        entry_count = await AsyncDB.get_history_count(interaction.guild_id, user.id)
+        unique_users = await AsyncDB.get_unique_traders_count(
+            interaction.guild_id, user.id
+        )
+        view = ReputationManager(interaction.guild_id, user, entry_count, unique_users)
+        await view.load_page(0)
         await interaction.followup.send(
             embed=view.get_page_embed(),
             view=view,
         )
 
+    @app_commands.guild_only()
+    @app_commands.command(
+        name="search_reviews",
+        description="Search reputation reviews by text (moderator only)",
+    )
+    @app_commands.describe(
+        query="Words to look for in the review text",
+        target="Only show reviews left for this user",
+        author="Only show reviews written by this user",
+    )
+    async def search_reviews(
+        self,
+        interaction: discord.Interaction,
+        query: str,
+        target: discord.Member | None = None,
+        author: discord.Member | None = None,
+    ):
+        await interaction.response.defer(ephemeral=True)
+
+        if (
+            interaction.user.id != OWNER_ID
+        ):  # TODO: Change this to be available for anyone Mod+
+            await interaction.followup.send("You are not allowed to use this command.")
+            return
+
+        view = SearchPaginator(interaction.guild_id, query, target, author)
+        await view.load_page(0)
+        if not view.page_entries:
+            await interaction.followup.send("No reviews match that search.")
+            return
+
+        await interaction.followup.send(embed=view.get_page_embed(), view=view)
+
+    @app_commands.guild_only()
     @app_commands.command(
         name="repboard", description="Display top users by reputation points"
     )
-    async def repboard(self, interaction: discord.Interaction):
+    @app_commands.describe(decayed="Weight recent reputation more than old reputation")
+    async def repboard(self, interaction: discord.Interaction, decayed: bool = False):
         await interaction.response.defer()
-        paginator = LeaderboardPaginator(per_page=10)
-        if not paginator.entries:
+        paginator = LeaderboardPaginator(
+            interaction.guild_id,
+            decayed,
+            "Recent Reputation Leaderboard" if decayed else "Reputation Leaderboard",
+        )
+        await paginator.load_page(0)
+        if not paginator.page.entries:
             await interaction.followup.send("No reputation data yet.")
             return
+
         await interaction.followup.send(
             embed=paginator.get_page_embed(), view=paginator
         )
 
+    @app_commands.guild_only()
     @app_commands.command(
         name="reprank", description="Display your ranking in the reputation leaderboard"
     )
-    async def reprank(self, interaction: discord.Interaction):
+    @app_commands.describe(decayed="Weight recent reputation more than old reputation")
+    async def reprank(self, interaction: discord.Interaction, decayed: bool = False):
         await interaction.response.defer()
-        rank = DB.get_user_rank(interaction.user.id)
+        rank = await AsyncDB.get_user_rank(
+            interaction.guild_id, interaction.user.id, decayed
+        )
         if rank == 0:
             await interaction.followup.send("You have no reputation points yet.")
             return
+        board = "recent reputation leaderboard" if decayed else "leaderboard"
         await interaction.followup.send(
-            f"You are currently ranked #{rank} on the leaderboard."
+            f"You are currently ranked #{rank} on the {board}."
         )
 
+    @app_commands.guild_only()
     @app_commands.command(
         name="traderank",
         description="Check your trading rank based on unique traders",
@@ -192,7 +280,9 @@ class Points(commands.Cog):
         await interaction.response.defer()
         member = user or interaction.user
 
-        unique_users = DB.get_unique_traders_count(member.id)
+        unique_users = await AsyncDB.get_unique_traders_count(
+            interaction.guild_id, member.id
+        )
 
         current_rank = None
         next_rank = None
@@ -210,46 +300,16 @@ class Points(commands.Cog):
                 "role_id": None,
             }
 
-        # Roles user SHOULD have
-        eligible_roles = {
-            rank["role_id"] for rank in TRADER_RANKS if unique_users >= rank["required"]
-        }
-
-        # All tracked trader roles
-        all_rank_roles = {rank["role_id"] for rank in TRADER_RANKS}
-
         user_role_ids = {role.id for role in member.roles}
 
-        # Determine role changes
-        roles_to_add_ids = eligible_roles - user_role_ids
-        roles_to_remove_ids = (user_role_ids & all_rank_roles) - eligible_roles
-
         # Detect rank-up (only if gaining current rank role)
         ranked_up = (
             current_rank["role_id"] is not None
             and current_rank["role_id"] not in user_role_ids
         )
 
-        # Resolve role objects
-        roles_to_add = [
-            interaction.guild.get_role(rid)
-            for rid in roles_to_add_ids
-            if interaction.guild.get_role(rid)
-        ]
-
-        roles_to_remove = [
-            interaction.guild.get_role(rid)
-            for rid in roles_to_remove_ids
-            if interaction.guild.get_role(rid)
-        ]
-
-        # Apply role changes (ALWAYS runs, even when checking others)
-        if roles_to_add:
-            await member.add_roles(*roles_to_add, reason="Trader rank sync (add)")
-        if roles_to_remove:
-            await member.remove_roles(
-                *roles_to_remove, reason="Trader rank sync (remove)"
-            )
+        # Apply rank role changes (ALWAYS runs, even when checking others)
+        await sync_rank_roles(member, interaction.guild, unique_users)
 
         # Progress text
         if next_rank:
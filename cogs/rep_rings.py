@@ -0,0 +1,80 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+from db import AsyncDB
+
+OWNER_ID = 923600698967461898
+SHOWN_CLUSTERS = 5
+SHOWN_PAIRS = 10
+PAIR_SCORE_THRESHOLD = 0.5  # Pairs below this get most of their rep from others
+
+
+class RepRings(commands.Cog):
+    def __init__(self, client: commands.Bot):
+        self.client = client
+
+    @app_commands.guild_only()
+    @app_commands.command(
+        name="rep_rings",
+        description="Find groups of users farming reputation from each other (moderator only)",
+    )
+    @app_commands.describe(
+        min_size="Smallest group of users to report (default 3)",
+    )
+    async def rep_rings(
+        self,
+        interaction: discord.Interaction,
+        min_size: app_commands.Range[int, 2, 50] = 3,
+    ):
+        await interaction.response.defer(ephemeral=True)
+
+        if (
+            interaction.user.id != OWNER_ID
+        ):  # TODO: Change this to be available for anyone Mod+
+            await interaction.followup.send("You are not allowed to use this command.")
+            return
+
+        report = await AsyncDB.get_ring_report(interaction.guild_id, min_size)
+
+        cluster_lines = []
+        for cluster in report.clusters[:SHOWN_CLUSTERS]:
+            members = " ".join(f"<@{user_id}>" for user_id in cluster.user_ids)
+            cluster_lines.append(
+                f"**Score {cluster.score:.2f}** — {len(cluster.user_ids)} users, "
+                f"density {cluster.density:.0%}, mutual {cluster.reciprocity:.0%}, "
+                f"rep from inside {cluster.insularity:.0%}\n{members}"
+            )
+            if cluster.cliques:
+                cluster_lines.append(
+                    f"Largest clique: {len(cluster.cliques[0])} users"
+                )
+
+        pair_lines = [
+            f"**{score:.2f}** — <@{first}> ⇄ <@{second}>"
+            for score, first, second in report.pairs[:SHOWN_PAIRS]
+            if score >= PAIR_SCORE_THRESHOLD
+        ]
+
+        embed = discord.Embed(
+            title="Reputation Ring Check",
+            description=(
+                f"{report.node_count} users, {report.edge_count} positive trade pairs, "
+                f"{len(report.pairs)} mutual pairs"
+            ),
+            color=discord.Color.orange(),
+        )
+        embed.add_field(
+            name="Suspicious Groups",
+            value="\n".join(cluster_lines)[:1024] or "None found.",
+            inline=False,
+        )
+        embed.add_field(
+            name="Isolated Mutual Pairs",
+            value="\n".join(pair_lines)[:1024] or "None found.",
+            inline=False,
+        )
+        await interaction.followup.send(embed=embed)
+
+
+async def setup(client: commands.Bot):
+    await client.add_cog(RepRings(client))
@@ -0,0 +1,92 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+import metrics
+from db import HOME_GUILD_ID, AsyncDB
+
+OWNER_ID = 923600698967461898
+TOP_COMMANDS = 8  # Busiest commands by total time shown in /stats
+FIELD_LIMIT = 1024  # Discord rejects embed field values longer than this
+
+
+def join_field(lines, empty: str) -> str:
+    # Joins whole lines while they fit in one embed field
+    value = ""
+    for line in lines:
+        line = line if len(line) <= FIELD_LIMIT else line[: FIELD_LIMIT - 1] + "…"
+        joined = f"{value}\n{line}" if value else line
+        if len(joined) > FIELD_LIMIT:
+            break
+        value = joined
+    return value or empty
+
+
+class Stats(commands.Cog):
+    def __init__(self, client: commands.Bot):
+        self.client = client
+
+    @app_commands.command(
+        name="stats", description="Command and query timings, this command is not for you"
+    )
+    async def stats(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+
+        if interaction.user.id != OWNER_ID:
+            await interaction.followup.send("This command is not for you.")
+            return
+
+        snapshot = metrics.registry.snapshot()
+
+        commands_run = sorted(
+            (
+                (total, label, count, p50, p95)
+                for (name, label), (_, total, count, p50, p95) in snapshot.items()
+                if name == "command_seconds"
+            ),
+            reverse=True,
+        )[:TOP_COMMANDS]
+        command_lines = []
+        for _, label, count, p50, p95 in commands_run:
+            _, db_total, _, _, _ = snapshot.get(("command_db_seconds", label), (0, 0, 0, 0, 0))
+            command_lines.append(
+                f"`{label}` — {count} runs, p50 ≤ {p50 * 1000:g}ms, p95 ≤ {p95 * 1000:g}ms, "
+                f"{db_total / count * 1000:.1f}ms DB avg"
+            )
+
+        statements = sorted(
+            (
+                (total, count, label)
+                for (name, label), (_, total, count, _, _) in snapshot.items()
+                if name == "sql_statement_seconds"
+            ),
+            reverse=True,
+        )[:5]
+        statement_lines = [
+            f"{total * 1000:.1f}ms over {count} runs — `{label}`"
+            for total, count, label in statements
+        ]
+
+        guild_id = interaction.guild_id or HOME_GUILD_ID
+        storage = await AsyncDB.get_storage_stats(guild_id)
+
+        embed = discord.Embed(title="Bot Stats", color=discord.Color.blurple())
+        embed.add_field(
+            name=f"Busiest Commands (top {TOP_COMMANDS} by total time)",
+            value=join_field(command_lines, "No commands recorded yet."),
+            inline=False,
+        )
+        embed.add_field(
+            name="Slowest Statements (total time)",
+            value=join_field(statement_lines, "No statements recorded yet."),
+            inline=False,
+        )
+        embed.add_field(
+            name=f"Storage (guild {guild_id})",
+            value=join_field((f"{key}: {value}" for key, value in storage.items()), "-"),
+            inline=False,
+        )
+        await interaction.followup.send(embed=embed)
+
+
+async def setup(client: commands.Bot):
+    await client.add_cog(Stats(client))
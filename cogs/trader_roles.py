@@ -0,0 +1,196 @@
+import asyncio
+import discord
+from discord.ext import commands, tasks
+from discord import app_commands
+from db import AsyncDB
+from model.trader_ranks import (
+    ALL_RANK_ROLE_IDS,
+    TRADER_RANKS,
+    get_rank_role_changes,
+    sync_rank_roles,
+)
+
+OWNER_ID = 923600698967461898
+
+# Role changes share one per-guild rate limit, stay well under it
+ROLE_EDITS_PER_WINDOW = 5
+ROLE_EDIT_WINDOW = 5.0  # seconds
+RECONCILE_INTERVAL = 10.0  # minutes between incremental runs
+
+
+class RoleEditScheduler:
+    # Applies queued trader rank syncs one member at a time, spaced out to
+    # respect the role change rate limit. Only the target unique trader count
+    # is queued; the rank roles to add or remove are worked out from the
+    # member's roles when the sync is sent, and only those are changed.
+    # Members missing from the cache are fetched on the same spacing. A newer
+    # sync for the same member replaces the pending one, so each member is
+    # synced at most once per drain.
+
+    def __init__(self, rate: int = ROLE_EDITS_PER_WINDOW, per: float = ROLE_EDIT_WINDOW):
+        self.interval = per / rate
+        self.pending = {}  # (guild id, user id) -> (guild, unique traders)
+        self.wake = asyncio.Event()
+        self.task = None
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def schedule(self, guild: discord.Guild, user_id: int, unique_users: int):
+        self.pending[guild.id, user_id] = (guild, unique_users)
+        self.wake.set()
+
+    async def run(self):
+        while True:
+            await self.wake.wait()
+            while self.pending:
+                key = next(iter(self.pending))
+                guild, unique_users = self.pending.pop(key)
+                try:
+                    requests = await self.apply(guild, key[1], unique_users)
+                except Exception as error:
+                    print(f"Failed to sync trader roles for {key[1]}: {error!r}")
+                    requests = 1
+                    if not isinstance(error, (discord.Forbidden, discord.NotFound)):
+                        await self.requeue(guild, key[1])  # Retried next run
+                if requests:
+                    await asyncio.sleep(self.interval * requests)
+            self.wake.clear()
+
+    async def apply(self, guild: discord.Guild, user_id: int, unique_users: int) -> int:
+        # Syncs one member's rank roles and returns how many requests it took
+        requests = 0
+        member = guild.get_member(user_id)
+        if member is None:
+            requests += 1
+            try:
+                member = await guild.fetch_member(user_id)
+            except discord.NotFound:
+                return requests  # Left the server
+
+        return requests + await sync_rank_roles(member, guild, unique_users)
+
+    async def requeue(self, guild: discord.Guild, user_id: int):
+        try:
+            await AsyncDB.requeue_changed_users(guild.id, [user_id])
+        except Exception as error:
+            print(f"Failed to requeue trader role sync for {user_id}: {error!r}")
+
+
+class TraderRoles(commands.Cog):
+    def __init__(self, client: commands.Bot):
+        self.client = client
+        self.scheduler = RoleEditScheduler()
+        self.baselined = set()  # Guilds that had their first full run
+        self.restart_handle = None
+
+    async def cog_load(self):
+        self.scheduler.start()
+        self.reconcile_loop.start()
+
+    async def cog_unload(self):
+        if self.restart_handle is not None:
+            self.restart_handle.cancel()
+        self.reconcile_loop.cancel()
+        self.scheduler.stop()
+
+    @tasks.loop(minutes=RECONCILE_INTERVAL)
+    async def reconcile_loop(self):
+        await self.reconcile()
+
+    @reconcile_loop.before_loop
+    async def before_reconcile_loop(self):
+        await self.client.wait_until_ready()
+
+    @reconcile_loop.error
+    async def reconcile_loop_error(self, error: BaseException):
+        # Failures inside a guild are handled there, so this only sees bugs.
+        # A loop that raised has stopped, start it again after one interval.
+        print(f"Trader role reconcile failed, restarting: {error!r}")
+        self.restart_handle = asyncio.get_running_loop().call_later(
+            RECONCILE_INTERVAL * 60, self.reconcile_loop.start
+        )
+
+    async def reconcile(self, full: bool = False) -> int:
+        # Queues role edits for everyone whose trader rank is out of sync and
+        # returns how many were queued. Each guild is checked against its own
+        # reputation. Incremental runs only look at users whose reputation
+        # changed in that guild since its previous run.
+        queued = 0
+        for guild in self.client.guilds:
+            rank_roles = [guild.get_role(role_id) for role_id in ALL_RANK_ROLE_IDS]
+            rank_roles = [role for role in rank_roles if role is not None]
+            if not rank_roles:
+                continue  # Not a server that uses trader ranks
+
+            changed = await AsyncDB.take_changed_users(guild.id)
+            try:
+                queued += await self.reconcile_guild(
+                    guild, rank_roles, changed, full or guild.id not in self.baselined
+                )
+            except Exception as error:
+                print(f"Failed to reconcile trader roles in {guild.id}: {error!r}")
+                if changed:  # Picked up again by the next run
+                    await AsyncDB.requeue_changed_users(guild.id, changed)
+        return queued
+
+    async def reconcile_guild(
+        self, guild: discord.Guild, rank_roles, changed: set[int], full: bool
+    ) -> int:
+        if full:
+            minimum = min(rank["required"] for rank in TRADER_RANKS)
+            counts = await AsyncDB.get_unique_trader_counts(guild.id, minimum=minimum)
+            if changed:  # Catches users who just dropped below every rank
+                counts.update(await AsyncDB.get_unique_trader_counts(guild.id, changed))
+
+            # Holders of a rank role may have dropped below it. The members
+            # intent (main.py) keeps role.members complete.
+            for role in rank_roles:
+                for member in role.members:
+                    counts.setdefault(member.id, 0)
+        else:
+            if not changed:
+                return 0
+            counts = await AsyncDB.get_unique_trader_counts(guild.id, changed)
+
+        queued = 0
+        for user_id, unique_users in counts.items():
+            member = guild.get_member(user_id)
+            if member is not None and not any(
+                get_rank_role_changes(member, guild, unique_users)
+            ):
+                continue  # Already in sync, uncached members are checked when applied
+
+            self.scheduler.schedule(guild, user_id, unique_users)
+            queued += 1
+
+        if full:
+            self.baselined.add(guild.id)
+        return queued
+
+    @app_commands.command(
+        name="sync_trader_roles",
+        description="Sync trader rank roles now, this command is not for you",
+    )
+    @app_commands.describe(full="Check every trader instead of only recent changes")
+    async def sync_trader_roles(
+        self, interaction: discord.Interaction, full: bool = False
+    ):
+        await interaction.response.defer(ephemeral=True)
+
+        if interaction.user.id != OWNER_ID:
+            await interaction.followup.send("This command is not for you.")
+            return
+
+        queued = await self.reconcile(full=full)
+        await interaction.followup.send(f"Queued trader role updates for {queued} members")
+
+
+async def setup(client: commands.Bot):
+    await client.add_cog(TraderRoles(client))
@@ -0,0 +1,72 @@
+import sqlite3
+import threading
+from collections import deque
+
+COOLDOWN_SWEEP_INTERVAL = 60.0  # Seconds between deletes of expired rows
+
+LOAD_SQL = "SELECT bucket, expires_at FROM cooldowns WHERE expires_at > ? ORDER BY expires_at"
+INSERT_SQL = "INSERT INTO cooldowns (bucket, expires_at) VALUES (?, ?)"
+SWEEP_SQL = "DELETE FROM cooldowns WHERE expires_at <= ?"
+
+
+class CooldownStore:
+    # Sliding-window rate limits. A limit is (bucket, rate, per): at most rate
+    # hits in any per seconds. Each bucket keeps the expiry time of every hit
+    # still inside its window, so a check is a few deque operations. The
+    # cooldowns table mirrors those expiries to survive restarts.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.expiries = {}  # bucket -> deque of expiry times, soonest first
+        self.swept_at = 0.0
+
+    def load(self, connection: sqlite3.Connection, now: float) -> int:
+        expiries = {}
+        for bucket, expires_at in connection.execute(LOAD_SQL, (now,)):
+            expiries.setdefault(bucket, deque()).append(expires_at)
+
+        with self.lock:
+            self.expiries = expiries
+        return len(expiries)
+
+    def hit(self, limits, now: float):
+        # Records a hit in every bucket when all of them have room and returns
+        # (0.0, None). Otherwise records nothing and returns the seconds until
+        # the blocking limit frees up, with that limit.
+        with self.lock:
+            for limit in limits:
+                bucket, rate, _ = limit
+                expiries = self.expiries.get(bucket)
+                if expiries is None:
+                    continue
+
+                while expiries and expiries[0] <= now:
+                    expiries.popleft()
+                if len(expiries) >= rate:
+                    return expiries[-rate] - now, limit
+
+            for bucket, _, per in limits:
+                self.expiries.setdefault(bucket, deque()).append(now + per)
+        return 0.0, None
+
+    def sweep(self, now: float):
+        # Drops buckets with nothing left in their window
+        with self.lock:
+            self.expiries = {
+                bucket: expiries
+                for bucket, expiries in self.expiries.items()
+                if expiries and expiries[-1] > now
+            }
+            for expiries in self.expiries.values():
+                while expiries[0] <= now:
+                    expiries.popleft()
+            self.swept_at = now
+
+
+def record(connection: sqlite3.Connection, store: CooldownStore, rows, now: float):
+    # Persists (bucket, expires_at) rows and, once per sweep interval, deletes
+    # expired ones from the table and the store
+    connection.executemany(INSERT_SQL, rows)
+    if now - store.swept_at >= COOLDOWN_SWEEP_INTERVAL:
+        connection.execute(SWEEP_SQL, (now,))
+        store.sweep(now)
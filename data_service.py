@@ -0,0 +1,179 @@
+import asyncio
+import builtins
+import io
+import os
+import pickle
+import struct
+
+from db import RPC_METHODS, AsyncDB
+
+SOCKET_PATH = "points-data.sock"  # Next to points.db, only this user can connect
+HEADER = struct.Struct("!I")  # Every frame is a length then a pickle
+MAX_FRAME = 64 * 1024 * 1024
+
+# Classes a frame may contain besides plain containers and scalars. Anything
+# else is refused while unpickling, so a frame can't run arbitrary code.
+ALLOWED_CLASSES = {
+    ("builtins", "set"),
+    ("builtins", "frozenset"),
+    ("db", "ExperienceType"),
+    ("leaderboard_cache", "LeaderboardPage"),
+    ("ring_detector", "RingCluster"),
+    ("ring_detector", "RingReport"),
+}
+
+
+class DataServiceError(Exception):
+    pass
+
+
+class FrameUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if (module, name) not in ALLOWED_CLASSES:
+            raise pickle.UnpicklingError(f"{module}.{name} is not allowed in a frame")
+        return super().find_class(module, name)
+
+
+def encode(message) -> bytes:
+    payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    return HEADER.pack(len(payload)) + payload
+
+
+async def read_message(reader: asyncio.StreamReader):
+    (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+    if length > MAX_FRAME:
+        raise ConnectionError(f"Frame of {length} bytes is over the limit")
+    return FrameUnpickler(io.BytesIO(await reader.readexactly(length))).load()
+
+
+def remote_error(name: str, message: str) -> Exception:
+    # Builtin exceptions come back as themselves so callers can still catch
+    # e.g. ValueError from an import, anything else as DataServiceError
+    error_class = getattr(builtins, name, None)
+    if isinstance(error_class, type) and issubclass(error_class, Exception):
+        return error_class(message)
+    return DataServiceError(f"{name}: {message}")
+
+
+class DataService:
+    # Owns the database for every bot process: the write path, rank indexes
+    # and caches all live here. Requests are (id, method, args, kwargs) for a
+    # method in RPC_METHODS, answered with (id, ok, result or error) in
+    # whatever order they finish.
+
+    def __init__(self, path: str = SOCKET_PATH):
+        self.path = path
+        self.server = None
+
+    async def start(self):
+        await AsyncDB.open()
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # Left behind by a previous run
+
+        umask = os.umask(0o177)  # Socket file readable by this user only
+        try:
+            self.server = await asyncio.start_unix_server(self.handle, self.path)
+        finally:
+            os.umask(umask)
+
+    async def serve_forever(self):
+        await self.server.serve_forever()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        await AsyncDB.close()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                request = await read_message(reader)
+                task = asyncio.create_task(self.respond(writer, write_lock, *request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError, pickle.UnpicklingError):
+            pass  # Client went away or sent something we won't read
+        finally:
+            writer.close()
+
+    async def respond(self, writer, write_lock, request_id, name, args, kwargs):
+        try:
+            method = RPC_METHODS.get(name)
+            if method is None:
+                raise LookupError(f"Unknown data service call {name!r}")
+            frame = encode((request_id, True, await method(*args, **kwargs)))
+        except Exception as error:
+            frame = encode((request_id, False, (type(error).__name__, str(error))))
+
+        async with write_lock:
+            if writer.is_closing():
+                return
+            writer.write(frame)
+            await writer.drain()
+
+
+class DataServiceClient:
+    # One connection per bot process, shared by every command. Calls are
+    # pipelined: each waits on its own future while replies come back on
+    # a single reader task.
+
+    def __init__(self, path: str = SOCKET_PATH):
+        self.path = path
+        self.reader = None
+        self.writer = None
+        self.reader_task = None
+        self.connect_lock = asyncio.Lock()
+        self.pending = {}  # request id -> future
+        self.next_id = 0
+
+    async def connect(self):
+        async with self.connect_lock:
+            if self.writer is not None:
+                return
+            self.reader, self.writer = await asyncio.open_unix_connection(self.path)
+            self.reader_task = asyncio.create_task(self.read_replies(self.reader))
+
+    async def close(self):
+        if self.writer is None:
+            return
+        self.writer.close()
+        await self.reader_task
+
+    async def call(self, name: str, args: tuple, kwargs: dict):
+        if self.writer is None:
+            await self.connect()  # Reconnects after the service restarted
+
+        self.next_id += 1
+        request_id = self.next_id
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        try:
+            self.writer.write(encode((request_id, name, args, kwargs)))
+            await self.writer.drain()
+            return await future
+        finally:
+            self.pending.pop(request_id, None)
+
+    async def read_replies(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                request_id, ok, result = await read_message(reader)
+                future = self.pending.get(request_id)
+                if future is None or future.done():
+                    continue
+                if ok:
+                    future.set_result(result)
+                else:
+                    future.set_exception(remote_error(*result))
+        except (asyncio.IncompleteReadError, ConnectionError, pickle.UnpicklingError):
+            pass
+        finally:
+            self.writer.close()
+            self.reader = self.writer = None
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Lost the data service"))
@@ -1,147 +1,1419 @@
+import asyncio
+import contextvars
+import functools
+import json
+import math
+import queue
+import re
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from enum import Enum
 
+import archive
+import cooldowns
+import metrics
+import transfer
+from decay import DecayClock
+from leaderboard_cache import LeaderboardCache
+from migrations import REBUILD_DECAYED_TOTALS, REBUILD_USER_TOTALS, migrate
+from rank_index import RankIndex, SortedRankIndex
+from ring_detector import RingDetector
+
+DATABASE_NAME = "points.db"  # The home guild's partition, from before guilds were split
+GUILD_DATABASE_NAME = "points-{guild_id}.db"  # Every other guild's partition
+HOME_GUILD_ID = 1047106748097503322
+READER_CONNECTIONS = 4
+WRITE_BATCH_SIZE = 100  # Most inserts committed in one transaction
+WRITE_BATCH_DELAY = 0.005  # Seconds an insert waits for others to share its commit
+MAX_ID = 2**63 - 1  # Largest SQLite rowid, used as the "no cursor yet" bound
+LEADERBOARD_REBUILD_INTERVAL = 5.0  # seconds a stale leaderboard may still be served
+DECAY_HALF_LIFE_DAYS = 180.0  # Changing this recomputes every decayed total on startup
+DECAY_REBASE_HALF_LIVES = 256  # Move the decay epoch before weights outgrow floats
+ARCHIVE_AFTER_DAYS = 365  # Default age for /archive_reputation
+
+# Each guild's writes are serialized on its own thread (GuildPartition), reads
+# get one thread per reader connection, so the event loop never waits on SQLite
+_read_executor = ThreadPoolExecutor(
+    max_workers=READER_CONNECTIONS, thread_name_prefix="points-db-read"
+)
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",  # WAL is still crash safe with NORMAL
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA cache_size = -16000",  # ~16MB page cache per connection
+    "PRAGMA temp_store = MEMORY",
+)
+
 
 class ExperienceType(Enum):
     positive = "positive"
     negative = "negative"
 
 
-class DB:
-    def __init__(self, database_name: str):
+class TimedCursor(sqlite3.Cursor):
+    # Records every statement's duration in the metrics registry
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            metrics.observe_statement(sql, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            metrics.observe_statement(sql, time.perf_counter() - started)
+
+
+class TimedConnection(sqlite3.Connection):
+    # Hands out TimedCursor for both cursor() and the execute shortcuts
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class ConnectionPool:
+    def __init__(self, database_name: str, readers: int = READER_CONNECTIONS):
         self.database_name = database_name
-        self.connection = None
-        self.cursor = None
-
-    def get_connection(self) -> sqlite3.Connection:
-        if self.connection == None:
-            connection = sqlite3.connect(self.database_name)
-            self.connection = connection
-            # If connection is not set
-            # Set connection
-            # Return connection either way
-
-        return self.connection
-
-    def get_cursor(self) -> sqlite3.Cursor:
-        if self.cursor == None:
-            connection = self.get_connection()
-            cursor = connection.cursor()
-            self.cursor = cursor
-            # If cursor is not set
-            # Set cursor
-            # Return cursor either way
-
-        return self.cursor
-
-    def exec_sql(self, sql: str, params: tuple | None = None):
-        # Note: this executes raw SQL which may be unsafe
-        connection = self.get_connection()
-        cursor = self.get_cursor()
+        self.reader_count = readers
+        self.writer = None
+        self.readers = queue.Queue()
+        self.write_lock = threading.RLock()
+        self.write_depth = 0
+        self.open_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.connections_opened = 0
+        self.writer_checkouts = 0
+        self.reader_checkouts = 0
+        # Epoch and half-life for this file's decayed totals, see DB.setup_decay
+        self.decay = DecayClock(DECAY_HALF_LIFE_DAYS * 86400)
 
-        if params is None:
-            cursor.execute(sql)
-        else:
-            cursor.execute(sql, params)
+    def connect(self, readonly: bool = False) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.database_name,
+            check_same_thread=False,
+            cached_statements=256,
+            factory=TimedConnection,
+        )
+        for pragma in PRAGMAS:
+            connection.execute(pragma)
+        # Only migration 7's triggers call this, later ones weight entries in SQL
+        connection.create_function("rep_weight", 1, self.decay.weight)
+        try:
+            connection.execute("SELECT pow(2.0, 1.0)")
+        except sqlite3.OperationalError:
+            # SQLite built without math functions, the triggers still need pow()
+            connection.create_function("pow", 2, math.pow, deterministic=True)
+        if readonly:
+            connection.execute("PRAGMA query_only = ON")
+
+        with self.stats_lock:
+            self.connections_opened += 1
+        return connection
+
+    def open(self):
+        with self.open_lock:
+            if self.writer is not None:
+                return  # Already open
+
+            self.writer = self.connect()
+            for _ in range(self.reader_count):
+                self.readers.put(self.connect(readonly=True))
+
+    def close(self):
+        with self.open_lock:
+            if self.writer is None:
+                return
+
+            with self.write_lock:
+                self.writer.close()
+                self.writer = None
+            for _ in range(self.reader_count):
+                self.readers.get().close()
+
+    @contextmanager
+    def read(self):
+        self.open()
+        connection = self.readers.get()
+        with self.stats_lock:
+            self.reader_checkouts += 1
+
+        try:
+            yield connection
+        finally:
+            self.readers.put(connection)
+
+    @contextmanager
+    def write(self):
+        # Everything inside the outermost block is one transaction
+        self.open()
+        with self.write_lock:
+            with self.stats_lock:
+                self.writer_checkouts += 1
+
+            self.write_depth += 1
+            try:
+                yield self.writer
+            except BaseException:
+                if self.write_depth == 1:
+                    self.writer.rollback()
+                raise
+            else:
+                if self.write_depth == 1:
+                    self.writer.commit()
+            finally:
+                self.write_depth -= 1
+
+    def stats(self) -> dict:
+        with self.stats_lock:
+            checkouts = self.writer_checkouts + self.reader_checkouts
+            return {
+                "connections_opened": self.connections_opened,
+                "writer_checkouts": self.writer_checkouts,
+                "reader_checkouts": self.reader_checkouts,
+                "connection_reuses": max(checkouts - self.connections_opened, 0),
+            }
+
+
+INSERT_ENTRY_SQL = """
+    INSERT INTO reputation (
+        target_user_id, author_user_id, point_value, reason, created_at
+    )
+    VALUES (?, ?, ?, ?, (julianday('now') - 2440587.5) * 86400.0)
+"""
+DELETE_ENTRY_SQL = (
+    "DELETE FROM reputation WHERE id = ? "
+    "RETURNING target_user_id, author_user_id"
+)
+DELETE_IDS_SQL = (
+    "DELETE FROM reputation WHERE id IN (SELECT value FROM json_each(?)) "
+    "RETURNING target_user_id, author_user_id"
+)
+DELETE_ID_RANGE_SQL = (
+    "DELETE FROM reputation WHERE id BETWEEN ? AND ? "
+    "RETURNING target_user_id, author_user_id"
+)
+DELETE_BY_AUTHOR_SQL = (
+    "DELETE FROM reputation WHERE author_user_id = ? "
+    "RETURNING target_user_id, author_user_id"
+)
+VOID_BETWEEN_SQL = (
+    "DELETE FROM reputation "
+    "WHERE (target_user_id = ? AND author_user_id = ?) "
+    "OR (target_user_id = ? AND author_user_id = ?) "
+    "RETURNING target_user_id, author_user_id"
+)
+# Best matches first, live and archived entries together. The target/author
+# filters are skipped when passed NULL. Archived rows come back without a
+# snippet but with their chunk id, archive_fts doesn't store the text.
+SEARCH_REVIEWS_SQL = """
+    SELECT id, target_user_id, author_user_id, point_value, snippet, chunk_id
+    FROM (
+        SELECT
+            reputation.id,
+            reputation.target_user_id,
+            reputation.author_user_id,
+            reputation.point_value,
+            snippet(reputation_fts, 0, '**', '**', '…', 16) AS snippet,
+            NULL AS chunk_id,
+            reputation_fts.rank AS rank
+        FROM reputation_fts
+        JOIN reputation ON reputation.id = reputation_fts.rowid
+        WHERE reputation_fts MATCH ?1
+        AND (?2 IS NULL OR reputation.target_user_id = ?2)
+        AND (?3 IS NULL OR reputation.author_user_id = ?3)
+        UNION ALL
+        SELECT
+            archive_entries.id,
+            archive_entries.target_user_id,
+            archive_entries.author_user_id,
+            archive_entries.point_value,
+            NULL,
+            archive_entries.chunk_id,
+            archive_fts.rank
+        FROM archive_fts
+        JOIN archive_entries ON archive_entries.id = archive_fts.rowid
+        WHERE archive_fts MATCH ?1
+        AND (?2 IS NULL OR archive_entries.target_user_id = ?2)
+        AND (?3 IS NULL OR archive_entries.author_user_id = ?3)
+    )
+    ORDER BY rank
+    LIMIT ?4 OFFSET ?5
+"""
+ARCHIVED_SNIPPET_CHARS = 120  # Archived reviews are shown from their start
+ALL_TOTALS_SQL = "SELECT user_id, total_points FROM user_totals"
+ALL_DECAYED_TOTALS_SQL = "SELECT user_id, decayed_points FROM user_totals"
+USER_TOTAL_POINTS_SQL = (
+    "SELECT total_points, decayed_points FROM user_totals WHERE user_id = ?"
+)
+RESCALE_DECAYED_SQL = "UPDATE user_totals SET decayed_points = decayed_points * ?"
+RESCALE_ARCHIVED_DECAYED_SQL = (
+    "UPDATE archive_totals SET decayed_points = decayed_points * ?"
+)
+GET_SETTING_SQL = "SELECT value FROM settings WHERE key = ?"
+SET_SETTING_SQL = (
+    "INSERT INTO settings (key, value) VALUES (?, ?) "
+    "ON CONFLICT (key) DO UPDATE SET value = excluded.value"
+)
+UNIQUE_TRADERS_SQL = "SELECT unique_positive_authors FROM user_totals WHERE user_id = ?"
+ALL_UNIQUE_TRADERS_SQL = (
+    "SELECT user_id, unique_positive_authors FROM user_totals "
+    "WHERE unique_positive_authors >= ?"
+)
+USER_TOTALS_SQL = (
+    "SELECT total_points, positive_count, negative_count, unique_positive_authors "
+    "FROM user_totals WHERE user_id = ?"
+)
+HISTORY_PAGE_SQL = (
+    "SELECT id, point_value, reason, author_user_id FROM reputation "
+    "WHERE target_user_id = ? AND id < ? ORDER BY id DESC LIMIT ?"
+)
+HISTORY_COUNT_SQL = "SELECT COUNT(*) FROM reputation WHERE target_user_id = ?"
+# Same lookups the user_totals triggers run on every insert and delete
+TRADE_PAIR_SQL = (
+    "SELECT positive_count FROM trade_pairs WHERE target_user_id = ? AND author_user_id = ?"
+)
+LAST_ENTRY_SQL = "SELECT 1 FROM reputation WHERE target_user_id = ?"
+TRADE_GRAPH_SQL = "SELECT author_user_id, target_user_id FROM trade_pairs"
+
+# Queries checked by DB.find_query_plan_scans, with placeholder parameters
+PRODUCTION_QUERIES = {
+    "delete_entry": (DELETE_ENTRY_SQL, (0,)),
+    "user_totals": (USER_TOTALS_SQL, (0,)),
+    "user_total_points": (USER_TOTAL_POINTS_SQL, (0,)),
+    "unique_traders": (UNIQUE_TRADERS_SQL, (0,)),
+    "history_page": (HISTORY_PAGE_SQL, (0, 0, 10)),
+    "history_count": (HISTORY_COUNT_SQL, (0,)),
+    "trade_pair": (TRADE_PAIR_SQL, (0, 0)),
+    "search_reviews": (SEARCH_REVIEWS_SQL, ('"mew"', None, None, 10, 0)),
+    "delete_ids": (DELETE_IDS_SQL, ("[]",)),
+    "delete_id_range": (DELETE_ID_RANGE_SQL, (0, 0)),
+    "delete_by_author": (DELETE_BY_AUTHOR_SQL, (0,)),
+    "void_between": (VOID_BETWEEN_SQL, (0, 0, 0, 0)),
+    "last_entry": (LAST_ENTRY_SQL, (0,)),
+    "archive_cutoff": (archive.CUTOFF_ID_SQL, (0.0,)),
+    "archive_oldest_rows": (archive.OLDEST_ROWS_SQL, (0, 10)),
+    "archive_delete": (archive.DELETE_ARCHIVED_SQL, (0, 0)),
+    "archive_user_chunks": (archive.USER_CHUNKS_SQL, (0, 0)),
+    "archived_count": (archive.ARCHIVED_COUNT_SQL, (0,)),
+    "cooldown_load": (cooldowns.LOAD_SQL, (0.0,)),
+    "cooldown_sweep": (cooldowns.SWEEP_SQL, (0.0,)),
+    "all_totals": (ALL_TOTALS_SQL, ()),
+    "all_decayed_totals": (ALL_DECAYED_TOTALS_SQL, ()),
+    "all_unique_traders": (ALL_UNIQUE_TRADERS_SQL, (5,)),
+    "trade_graph": (TRADE_GRAPH_SQL, ()),
+    "archive_all_chunks": (archive.ALL_CHUNKS_SQL, ()),
+    "archive_chunk": (archive.CHUNK_SQL, (0,)),
+    "archive_index_chunks": (archive.ALL_CHUNK_IDS_SQL, ()),
+    "archived_ids": (archive.ARCHIVED_IDS_SQL, ("[]",)),
+    "archived_id_range": (archive.ARCHIVED_ID_RANGE_SQL, (0, 0)),
+    "archived_by_author": (archive.ARCHIVED_BY_AUTHOR_SQL, (0,)),
+    "archived_between": (archive.ARCHIVED_BETWEEN_SQL, (0, 0, 0, 0)),
+    # Writes, checked for their own lookups; what they fire is checked
+    # statement by statement through trigger_statements
+    "insert_entry": (INSERT_ENTRY_SQL, (0, 0, 1, "")),
+    "get_setting": (GET_SETTING_SQL, ("decay_epoch",)),
+    "set_setting": (SET_SETTING_SQL, ("decay_epoch", 0.0)),
+    "rescale_decayed": (RESCALE_DECAYED_SQL, (1.0,)),
+    "rescale_archived_decayed": (RESCALE_ARCHIVED_DECAYED_SQL, (1.0,)),
+    "cooldown_insert": (cooldowns.INSERT_SQL, ("", 0.0)),
+    "archive_insert_chunk": (archive.INSERT_CHUNK_SQL, (0, 0, 0, 0, b"")),
+    "archive_rollup_totals": (archive.ROLLUP_TOTALS_SQL, (0, 0, 0, 0, 0, 0.0)),
+    "archive_rollup_pairs": (archive.ROLLUP_PAIRS_SQL, (0, 0, 0)),
+    "archive_start": (archive.START_ARCHIVING_SQL, ()),
+    "archive_stop": (archive.STOP_ARCHIVING_SQL, ()),
+    "archive_set_up_to": (archive.SET_ARCHIVED_UP_TO_SQL, (0,)),
+    "archive_up_to": (archive.ARCHIVED_UP_TO_SQL, ()),
+    "archive_insert_entry": (archive.INSERT_ENTRY_SQL, (0, 0, 0, 0, 0)),
+    "archive_index_text": (archive.INDEX_TEXT_SQL, (0, "")),
+    "archive_index_pending": (archive.INDEX_PENDING_SQL, ()),
+    "archive_index_done": (archive.INDEX_DONE_SQL, ()),
+    "archive_set_decayed": (archive.SET_ARCHIVED_DECAYED_SQL, (0.0, 0)),
+    "export": (transfer.EXPORT_SQL, ()),
+    "import_entry": (transfer.IMPORT_SQL, dict.fromkeys(transfer.COLUMNS, 0)),
+    "import_existing_ids": (transfer.EXISTING_IDS_SQL, ("[]",)),
+    "import_next_id": (transfer.NEXT_ID_SQL, ()),
+    "import_defer_fts": (transfer.DEFER_FTS_SQL, ()),
+    "import_resume_fts": (transfer.RESUME_FTS_SQL, ()),
+    "import_index_fts": (transfer.INDEX_FTS_SQL, ("[]",)),
+}
+# Production queries meant to read a whole table, with the one table each may
+# scan. A scan of any other table, or by any other query, is still reported.
+INTENTIONAL_SCANS = {
+    "all_decayed_totals": "user_totals",  # Loads the decayed rank index on open
+    "all_unique_traders": "user_totals",  # Full trader role runs, rare and off the loop
+    "trade_graph": "trade_pairs",  # Loads the ring detector once
+    "archive_all_chunks": "reputation_archive",  # Recomputing decayed totals
+    "archive_index_chunks": "reputation_archive",  # Once, after migration 12
+    "rescale_decayed": "user_totals",  # Moving the decay epoch, every few decades
+    "rescale_archived_decayed": "archive_totals",  # Same
+    "export": "reputation",  # Streams every entry
+}
+TRIGGER_BODY = re.compile(r"\bBEGIN\b(.*)\bEND\s*$", re.IGNORECASE | re.DOTALL)
+TRIGGER_WHEN = re.compile(r"\bWHEN\b(.*?)\bBEGIN\b", re.IGNORECASE | re.DOTALL)
+TRIGGER_ROW_VALUE = re.compile(r"\b(?:NEW|OLD)\.\w+", re.IGNORECASE)
+
+
+def trigger_statements(connection: sqlite3.Connection) -> list[tuple[str, str, tuple]]:
+    # Every statement a trigger in the schema runs (and its WHEN condition),
+    # as (name, sql, params) with NEW./OLD. columns turned into parameters.
+    # EXPLAIN QUERY PLAN on the writes that fire them doesn't show these.
+    statements = []
+    for name, sql in connection.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' ORDER BY name"
+    ):
+        when = TRIGGER_WHEN.search(sql)
+        if when:
+            statements.append((f"trigger {name} when", f"SELECT 1 WHERE {when[1]}"))
+
+        body = [part for part in TRIGGER_BODY.search(sql)[1].split(";") if part.strip()]
+        for number, statement in enumerate(body, 1):
+            statements.append((f"trigger {name} #{number}", statement))
+
+    return [
+        (
+            name,
+            TRIGGER_ROW_VALUE.sub("?", statement),
+            (0,) * len(TRIGGER_ROW_VALUE.findall(statement)),
+        )
+        for name, statement in statements
+    ]
+
+
+class GuildPartition:
+    # One guild's reputation: its own database file, connections and writer
+    # thread, plus the in-memory structures built from it. Partitions share
+    # nothing, so a busy guild's writes never hold up another guild's reads.
+
+    def __init__(self, guild_id: int, database_name: str):
+        self.guild_id = guild_id
+        self.pool = ConnectionPool(database_name)
+        self.decay = self.pool.decay
+        self.write_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"points-db-write-{guild_id}"
+        )
+        self.write_queue = WriteQueue(guild_id)
+
+        # In-memory leaderboard order, loaded on open and patched after every write
+        self.rank_index = RankIndex()
+        # Same for decayed totals, scored by their stored (epoch-relative) value
+        self.decayed_rank_index = SortedRankIndex()
+        # Users whose totals changed since the last take_changed_users()
+        self.changed_users = set()
+        self.changed_users_lock = threading.Lock()
+        # Set when patching the indexes after a write failed, reloaded on the next one
+        self.indexes_dirty = False
+
+        # Positive author -> target graph for ring detection, loaded on first use
+        self.ring_detector = RingDetector()
+        # Sliding-window command limits, loaded on open
+        self.cooldowns = cooldowns.CooldownStore()
+
+        self.leaderboard_cache = LeaderboardCache(
+            self.rank_index.page_after,
+            rebuild_interval=LEADERBOARD_REBUILD_INTERVAL,
+        )
+        self.decayed_leaderboard_cache = LeaderboardCache(
+            self.decayed_rank_index.page_after,
+            lambda stored: round(self.decay.current(stored), 1),
+            rebuild_interval=LEADERBOARD_REBUILD_INTERVAL,
+        )
+
+    def open(self) -> int:
+        # Brings the schema up to date and loads the rank indexes, returns
+        # the schema version
+        with self.pool.write() as connection:
+            version = migrate(connection)
+
+        with self.pool.write() as connection:
+            indexed = archive.index_pending_chunks(connection)
+        if indexed:
+            print(f"Indexed {indexed} archive chunks for guild {self.guild_id}")
+
+        self.setup_decay()
+        self.load_rank_index()
+        with self.pool.read() as connection:
+            self.cooldowns.load(connection, time.time())
+        return version
+
+    def close(self):
+        self.write_executor.shutdown()  # Lets queued writes finish first
+        self.pool.close()
+
+    def setup_decay(self, half_life_days: float = DECAY_HALF_LIFE_DAYS):
+        # Loads the stored decay epoch. A first run or a changed half-life
+        # starts a new epoch and recomputes every decayed total.
+        half_life = half_life_days * 86400
+        with self.pool.write() as connection:
+            stored_half_life = connection.execute(
+                GET_SETTING_SQL, ("decay_half_life",)
+            ).fetchone()
+            stored_epoch = connection.execute(
+                GET_SETTING_SQL, ("decay_epoch",)
+            ).fetchone()
+
+            if stored_half_life and stored_epoch and stored_half_life[0] == half_life:
+                self.decay.half_life = half_life
+                self.decay.epoch = stored_epoch[0]
+            else:
+                self.decay.half_life = half_life
+                self.decay.epoch = time.time()
+                # Stored first, the rebuild and the triggers weight from settings
+                connection.execute(SET_SETTING_SQL, ("decay_half_life", half_life))
+                connection.execute(SET_SETTING_SQL, ("decay_epoch", self.decay.epoch))
+                archive.recompute_decayed(connection, self.decay.weight)
+                connection.execute(REBUILD_DECAYED_TOTALS)
+                print(
+                    f"Recomputed decayed totals for guild {self.guild_id} "
+                    f"with a {half_life_days:g} day half-life"
+                )
+
+        if self.decay.half_lives_elapsed() > DECAY_REBASE_HALF_LIVES:
+            self.rebase_decay()
+
+    def rebase_decay(self):
+        # Moves the epoch to now, rescaling stored totals so current values
+        # (and the leaderboard order) stay the same
+        with self.pool.write() as connection:
+            now = time.time()
+            scale = self.decay.current(1.0, now)
+            connection.execute(RESCALE_DECAYED_SQL, (scale,))
+            connection.execute(RESCALE_ARCHIVED_DECAYED_SQL, (scale,))
+            connection.execute(SET_SETTING_SQL, ("decay_epoch", now))
+            self.decay.epoch = now
+
+        with self.pool.read() as connection:
+            self.decayed_rank_index.load(connection.execute(ALL_DECAYED_TOTALS_SQL))
+        self.decayed_leaderboard_cache.invalidate()
+
+    def load_rank_index(self) -> int:
+        with self.pool.read() as connection:
+            self.rank_index.load(connection.execute(ALL_TOTALS_SQL))
+            self.decayed_rank_index.load(connection.execute(ALL_DECAYED_TOTALS_SQL))
+        self.leaderboard_cache.invalidate()
+        self.decayed_leaderboard_cache.invalidate()
+        return len(self.rank_index)
+
+    def sync_rank_index(self, user_ids):
+        # Copies the committed totals of user_ids into the rank indexes
+        user_ids = set(user_ids)
+        with self.pool.write() as connection:
+            for user_id in user_ids:
+                row = connection.execute(USER_TOTAL_POINTS_SQL, (user_id,)).fetchone()
+                self.rank_index.update(user_id, row[0] if row else None)
+                self.decayed_rank_index.update(user_id, row[1] if row else None)
+
+        self.mark_changed_users(user_ids)
+        self.leaderboard_cache.invalidate()
+        self.decayed_leaderboard_cache.invalidate()
+
+    def mark_changed_users(self, user_ids):
+        with self.changed_users_lock:
+            self.changed_users.update(user_ids)
+
+    def take_changed_users(self) -> set[int]:
+        with self.changed_users_lock:
+            taken = set(self.changed_users)
+            self.changed_users.clear()
+        return taken
+
+    def load_ring_detector(self) -> int:
+        with self.pool.read() as connection:
+            self.ring_detector.load(connection.execute(TRADE_GRAPH_SQL))
+        return self.ring_detector.edge_count
+
+    def sync_ring_detector(self, pairs):
+        # pairs are (target_user_id, author_user_id) whose trade_pairs row may
+        # have appeared or gone away. Skipped until the detector is first used.
+        if not self.ring_detector.loaded:
+            return
+
+        pairs = set(pairs)
+        with self.pool.write() as connection:
+            for target_user_id, author_user_id in pairs:
+                row = connection.execute(
+                    TRADE_PAIR_SQL, (target_user_id, author_user_id)
+                ).fetchone()
+                self.ring_detector.set_edge(
+                    author_user_id, target_user_id, row is not None
+                )
+
+    def reload_indexes(self):
+        # Rebuilds every in-memory structure from disk instead of patching it
+        self.load_rank_index()
+        if self.ring_detector.loaded:
+            self.load_ring_detector()
+        self.indexes_dirty = False
 
-        connection.commit()
+    def after_write(self, rows):
+        # rows are (target_user_id, author_user_id) touched by a committed write
+        rows = list(rows)
+        self.sync_after_write((row[0] for row in rows), rows)
+
+    def sync_after_write(self, user_ids, pairs):
+        # Patches the rank indexes and ring detector after a committed write.
+        # The write is on disk by now, so a failure here must not fail (or
+        # repeat) it: it is printed and everything is reloaded on the next write.
+        user_ids = set(user_ids)
+        try:
+            if self.indexes_dirty:
+                self.reload_indexes()
+                self.mark_changed_users(user_ids)
+            else:
+                self.sync_rank_index(user_ids)
+                self.sync_ring_detector(pairs)
+        except Exception as error:
+            print(
+                f"Failed to sync indexes for guild {self.guild_id}, "
+                f"reloading on the next write: {error!r}"
+            )
+            self.indexes_dirty = True
+            self.mark_changed_users(user_ids)
+
+    def stats(self) -> dict:
+        return self.pool.stats() | self.leaderboard_cache.stats()
+
+
+class Partitions:
+    # guild id -> GuildPartition, opened on first use. Opening migrates the
+    # file and loads the rank indexes, so keep get() off the event loop
+    # (AsyncDB.partition does that).
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_guild = {}
+        self.database_names = {}
+
+    def database_name(self, guild_id: int) -> str:
+        if guild_id in self.database_names:
+            return self.database_names[guild_id]
+        if guild_id == HOME_GUILD_ID:
+            return DATABASE_NAME
+        return GUILD_DATABASE_NAME.format(guild_id=guild_id)
+
+    def attach(self, guild_id: int, database_name: str):
+        # Points a guild at a specific file, only before its first use
+        self.database_names[guild_id] = database_name
+
+    def get(self, guild_id: int) -> GuildPartition:
+        partition = self.by_guild.get(guild_id)
+        if partition is not None:
+            return partition
+
+        with self.lock:
+            partition = self.by_guild.get(guild_id)
+            if partition is None:
+                partition = GuildPartition(guild_id, self.database_name(guild_id))
+                partition.open()
+                self.by_guild[guild_id] = partition
+                print(
+                    f"Opened guild {guild_id} database "
+                    f"({len(partition.rank_index)} ranked users)"
+                )
+            return partition
+
+    def opened(self) -> list[GuildPartition]:
+        with self.lock:
+            return list(self.by_guild.values())
+
+    def close(self):
+        with self.lock:
+            for partition in self.by_guild.values():
+                partition.close()
+            self.by_guild.clear()
+
+
+partitions = Partitions()
+
+
+class DB:
+    # Every helper works on one guild's partition, guild_id always comes first
+
+    @staticmethod
+    def exec_sql(guild_id: int, sql: str, params: tuple | None = None):
+        # Note: this executes raw SQL which may be unsafe
+        with partitions.get(guild_id).pool.write() as connection:
+            if params is None:
+                return connection.execute(sql)
+            return connection.execute(sql, params)
 
     @staticmethod
     def add_entry_to_points_db(
+        guild_id: int,
         target_user_id: int,
         author_user_id: int,
         experience_type: ExperienceType,
         reason: str,
     ):
+        point_value = DB.point_value(experience_type)
+        return DB.insert_entry(
+            guild_id, target_user_id, author_user_id, point_value, reason
+        )
+
+    @staticmethod
+    def point_value(experience_type: ExperienceType) -> int:
         # Determine point value
         if experience_type == ExperienceType.positive:
-            point_value = 1
-        else:
-            point_value = -1
+            return 1
+        return -1
 
-        sql = """
-            INSERT INTO reputation (target_user_id, author_user_id, point_value, reason)
-            VALUES (?, ?, ?, ?)
-        """
+    @staticmethod
+    def insert_entry(
+        guild_id: int,
+        target_user_id: int,
+        author_user_id: int,
+        point_value: int,
+        reason: str,
+    ) -> int:
+        return DB.insert_entries(
+            guild_id, [(target_user_id, author_user_id, point_value, reason)]
+        )[0]
 
-        db = DB("points.db")
-        db.exec_sql(sql, (target_user_id, author_user_id, point_value, reason))
+    @staticmethod
+    def insert_entries(guild_id: int, entries) -> list[int]:
+        # entries are (target_user_id, author_user_id, point_value, reason),
+        # all inserted in one transaction. Returns the new row ids in order,
+        # and only raises if that transaction did not commit.
+        partition = partitions.get(guild_id)
+        if partition.decay.half_lives_elapsed() > DECAY_REBASE_HALF_LIVES:
+            partition.rebase_decay()
+
+        with partition.pool.write() as connection:
+            row_ids = [
+                connection.execute(INSERT_ENTRY_SQL, entry).lastrowid
+                for entry in entries
+            ]
+
+        partition.sync_after_write(
+            (entry[0] for entry in entries),
+            [(entry[0], entry[1]) for entry in entries if entry[2] > 0],
+        )
+        return row_ids
 
     @staticmethod
-    def setup_points_db():
-        sql = """
-            CREATE TABLE IF NOT EXISTS reputation (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                target_user_id INTEGER,
-                author_user_id INTEGER,
-                point_value INTEGER, -- inferred
-                reason TEXT
-            )
-        """
+    def delete_entry(guild_id: int, entry_id: int) -> int | None:
+        # Returns the target user of the deleted entry, None if there was none
+        partition = partitions.get(guild_id)
+        with partition.pool.write() as connection:
+            rows = connection.execute(DELETE_ENTRY_SQL, (entry_id,)).fetchall()
+
+        partition.after_write(rows)
+        return rows[0][0] if rows else None
+
+    @staticmethod
+    def delete_entries_where(
+        guild_id: int, sql: str, params: tuple, archived_sql: str
+    ) -> tuple[int, int]:
+        # Runs one of the bulk DELETE ... RETURNING target_user_id, author_user_id
+        # statements in a single transaction. Archived entries live in
+        # compressed chunks and are never deleted, archived_sql counts the ones
+        # the same filter matches so callers can report them.
+        # Returns (entries removed, archived entries skipped).
+        partition = partitions.get(guild_id)
+        with partition.pool.write() as connection:
+            rows = connection.execute(sql, params).fetchall()
+            (skipped,) = connection.execute(archived_sql, params).fetchone()
 
-        db = DB("points.db")
-        db.exec_sql(sql)
+        partition.after_write(rows)
+        return len(rows), skipped
 
     @staticmethod
-    def get_leaderboard(top_n: int = 10):
-        db = DB("points.db")
-        cursor = db.get_cursor()
-        cursor.execute(
-            """
-            SELECT target_user_id, SUM(point_value) as total_points
-            FROM reputation
-            GROUP BY target_user_id
-            ORDER BY total_points DESC
-            LIMIT ?
-            """,
-            (top_n,),
+    def delete_entries(guild_id: int, entry_ids: list[int]) -> tuple[int, int]:
+        return DB.delete_entries_where(
+            guild_id, DELETE_IDS_SQL, (json.dumps(entry_ids),), archive.ARCHIVED_IDS_SQL
         )
-        return cursor.fetchall()
 
     @staticmethod
-    def get_user_rank(user_id: int):
-        # This is for the leaderboard.
-        db = DB("points.db")
-        cursor = db.get_cursor()
+    def delete_entry_range(guild_id: int, first_id: int, last_id: int) -> tuple[int, int]:
+        return DB.delete_entries_where(
+            guild_id, DELETE_ID_RANGE_SQL, (first_id, last_id), archive.ARCHIVED_ID_RANGE_SQL
+        )
+
+    @staticmethod
+    def delete_entries_by_author(guild_id: int, author_user_id: int) -> tuple[int, int]:
+        return DB.delete_entries_where(
+            guild_id, DELETE_BY_AUTHOR_SQL, (author_user_id,), archive.ARCHIVED_BY_AUTHOR_SQL
+        )
 
-        # Check if user has any points
-        cursor.execute(
-            "SELECT COALESCE(SUM(point_value), 0) FROM reputation WHERE target_user_id = ?",
-            (user_id,),
+    @staticmethod
+    def void_entries_between(
+        guild_id: int, first_user_id: int, second_user_id: int
+    ) -> tuple[int, int]:
+        # Every entry either user left for the other
+        return DB.delete_entries_where(
+            guild_id,
+            VOID_BETWEEN_SQL,
+            (first_user_id, second_user_id, second_user_id, first_user_id),
+            archive.ARCHIVED_BETWEEN_SQL,
         )
-        total = cursor.fetchone()[0]
 
-        if total == 0:
+    @staticmethod
+    def get_ring_report(guild_id: int, min_size: int):
+        partition = partitions.get(guild_id)
+        if not partition.ring_detector.loaded:
+            partition.load_ring_detector()
+        return partition.ring_detector.analyse(min_size)
+
+    @staticmethod
+    def setup_points_db(guild_id: int) -> int:
+        # Brings the schema up to date, returns the schema version
+        return partitions.get(guild_id).open()
+
+    @staticmethod
+    def load_rank_index(guild_id: int) -> int:
+        return partitions.get(guild_id).load_rank_index()
+
+    @staticmethod
+    def rebuild_user_totals(guild_id: int) -> int:
+        # One-shot recompute from the raw reputation rows
+        partition = partitions.get(guild_id)
+        with partition.pool.write() as connection:
+            connection.executescript(
+                f"BEGIN;\n{REBUILD_USER_TOTALS}\n{REBUILD_DECAYED_TOTALS}\nCOMMIT;"
+            )
+
+        partition.reload_indexes()
+        return len(partition.rank_index)
+
+    @staticmethod
+    def find_query_plan_scans(connection: sqlite3.Connection) -> list[tuple[str, str]]:
+        # Returns (query name, plan detail) for every production query or
+        # trigger statement that falls back to a full table scan instead of
+        # using an index, apart from the scans listed in INTENTIONAL_SCANS
+        scans = []
+        queries = [(name, sql, params) for name, (sql, params) in PRODUCTION_QUERIES.items()]
+
+        for name, sql, params in queries + trigger_statements(connection):
+            plan = connection.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+            for row in plan:
+                detail = row[-1]
+                if detail == f"SCAN {INTENTIONAL_SCANS.get(name)}":
+                    continue
+                if detail.startswith("SCAN (subquery"):
+                    continue  # Walks rows the subquery already found
+                if detail == "SCAN CONSTANT ROW":
+                    continue  # SELECT without a table, like a trigger's WHEN
+                if detail.startswith("SCAN") and "INDEX" not in detail:
+                    scans.append((name, detail))
+
+        return scans
+
+    @staticmethod
+    def check_query_plans(guild_id: int) -> list[tuple[str, str]]:
+        with partitions.get(guild_id).pool.read() as connection:
+            return DB.find_query_plan_scans(connection)
+
+    @staticmethod
+    def get_leaderboard(guild_id: int, top_n: int = 10):
+        return partitions.get(guild_id).rank_index.page(0, top_n)
+
+    @staticmethod
+    def get_leaderboard_pages(guild_id: int, cursor, count: int, decayed: bool = False):
+        # Up to count consecutive pages starting after keyset cursor
+        # (score, user_id), None for the top of the leaderboard
+        partition = partitions.get(guild_id)
+        cache = partition.decayed_leaderboard_cache if decayed else partition.leaderboard_cache
+        pages = [cache.get(cursor)]
+        while len(pages) < count and pages[-1].has_next:
+            pages.append(cache.get(pages[-1].cursor))
+        return pages
+
+    @staticmethod
+    def get_user_totals(guild_id: int, user_id: int) -> tuple[int, int, int, int]:
+        # (total points, positive count, negative count, unique positive authors)
+        with partitions.get(guild_id).pool.read() as connection:
+            cursor = connection.execute(USER_TOTALS_SQL, (user_id,))
+            row = cursor.fetchone()
+            return row if row else (0, 0, 0, 0)
+
+    @staticmethod
+    def get_user_rank(guild_id: int, user_id: int, decayed: bool = False):
+        # This is for the leaderboard.
+        partition = partitions.get(guild_id)
+        index = partition.decayed_rank_index if decayed else partition.rank_index
+        if not index.score(user_id):
             return 0  # unranked
 
-        # Compute rank
-        cursor.execute(
-            """
-            SELECT COUNT(*) + 1 FROM (
-                SELECT target_user_id, SUM(point_value) as total_points
-                FROM reputation
-                GROUP BY target_user_id
-                HAVING total_points > ?
+        return index.rank(user_id)
+
+    @staticmethod
+    def get_unique_traders_count(guild_id: int, user_id: int) -> int:
+        return DB.get_user_totals(guild_id, user_id)[3]
+
+    @staticmethod
+    def get_unique_trader_counts(
+        guild_id: int, user_ids=None, minimum: int = 1
+    ) -> dict[int, int]:
+        # {user_id: unique traders}. With user_ids, every requested user is
+        # included (0 when they have no reputation); without, every user at
+        # or above minimum is returned in one query.
+        with partitions.get(guild_id).pool.read() as connection:
+            if user_ids is None:
+                return dict(connection.execute(ALL_UNIQUE_TRADERS_SQL, (minimum,)))
+
+            counts = {}
+            for user_id in user_ids:
+                row = connection.execute(UNIQUE_TRADERS_SQL, (user_id,)).fetchone()
+                counts[user_id] = row[0] if row else 0
+            return counts
+
+    @staticmethod
+    def take_changed_users(guild_id: int) -> set[int]:
+        return partitions.get(guild_id).take_changed_users()
+
+    @staticmethod
+    def requeue_changed_users(guild_id: int, user_ids):
+        # Gives back users taken by take_changed_users that could not be synced
+        partitions.get(guild_id).mark_changed_users(user_ids)
+
+    @staticmethod
+    def record_cooldown(guild_id: int, rows, now: float):
+        partition = partitions.get(guild_id)
+        with partition.pool.write() as connection:
+            cooldowns.record(connection, partition.cooldowns, rows, now)
+
+    @staticmethod
+    def to_match_query(text: str) -> str:
+        # Quotes every word so user input can't hit FTS5 query syntax
+        words = text.split()
+        return " ".join('"' + word.replace('"', '""') + '"' for word in words)
+
+    @staticmethod
+    def search_reviews(
+        guild_id: int,
+        text: str,
+        target_user_id: int | None,
+        author_user_id: int | None,
+        limit: int,
+        offset: int = 0,
+    ):
+        # (id, target, author, point_value, highlighted snippet), best match first
+        match_query = DB.to_match_query(text)
+        if not match_query:
+            return []
+
+        with partitions.get(guild_id).pool.read() as connection:
+            rows = connection.execute(
+                SEARCH_REVIEWS_SQL,
+                (match_query, target_user_id, author_user_id, limit, offset),
+            ).fetchall()
+
+            results = []
+            for entry_id, target, author, points, snippet, chunk_id in rows:
+                if chunk_id is not None:
+                    reason = archive.archived_reason(connection, chunk_id, entry_id)
+                    if len(reason) > ARCHIVED_SNIPPET_CHARS:
+                        reason = reason[: ARCHIVED_SNIPPET_CHARS - 1] + "…"
+                    snippet = f"{reason} *(archived)*"
+                results.append((entry_id, target, author, points, snippet))
+            return results
+
+    @staticmethod
+    def export_reputation(guild_id: int, path: str, fmt: str | None = None) -> int:
+        # Returns how many entries were written
+        with partitions.get(guild_id).pool.read() as connection:
+            with open(path, "w", newline="", encoding="utf-8") as file:
+                return transfer.export_reputation(
+                    connection, file, fmt or transfer.format_for(path)
+                )
+
+    @staticmethod
+    def import_reputation(
+        guild_id: int, path: str, fmt: str | None = None
+    ) -> tuple[int, int]:
+        # Returns (inserted, skipped). The in-memory indexes are reloaded
+        # afterwards rather than patched row by row.
+        partition = partitions.get(guild_id)
+        try:
+            with open(path, newline="", encoding="utf-8") as file:
+                return transfer.import_reputation(
+                    partition.pool.write, file, fmt or transfer.format_for(path)
+                )
+        finally:
+            # Batches before a bad line are committed, reload for those too
+            partition.reload_indexes()
+
+    @staticmethod
+    def backup_database(guild_id: int, path: str) -> int:
+        # Returns the size of the snapshot in bytes
+        with partitions.get(guild_id).pool.read() as connection:
+            return transfer.backup(connection, path)
+
+    @staticmethod
+    def get_history_page(
+        guild_id: int, user_id: int, before_id: int | None, limit: int
+    ):
+        # Newest first, (id, point_value, reason, author_user_id) with id < before_id.
+        # Archived entries are older than every live one, so the archive is
+        # only opened once the live rows run out.
+        before_id = MAX_ID if before_id is None else before_id
+        with partitions.get(guild_id).pool.read() as connection:
+            rows = connection.execute(
+                HISTORY_PAGE_SQL, (user_id, before_id, limit)
+            ).fetchall()
+            if len(rows) < limit:
+                rows += archive.history_page(
+                    connection,
+                    user_id,
+                    rows[-1][0] if rows else before_id,
+                    limit - len(rows),
+                )
+            return rows
+
+    @staticmethod
+    def get_history_count(guild_id: int, user_id: int) -> int:
+        # Counted from the history index plus the archive rollup, never
+        # touches the rows themselves
+        with partitions.get(guild_id).pool.read() as connection:
+            live = connection.execute(HISTORY_COUNT_SQL, (user_id,)).fetchone()[0]
+            return live + archive.archived_count(connection, user_id)
+
+    @staticmethod
+    def archive_reputation(
+        guild_id: int, older_than_days: float = ARCHIVE_AFTER_DAYS
+    ) -> tuple[int, int]:
+        # Moves entries older than the cutoff into the compressed archive, one
+        # short transaction per batch, then hands the freed pages back to the
+        # filesystem. Totals, unique traders and the rank indexes don't change.
+        # Returns (entries archived, pages freed).
+        partition = partitions.get(guild_id)
+        with partition.pool.read() as connection:
+            cutoff = archive.cutoff_id(connection, time.time() - older_than_days * 86400)
+
+        archived = 0
+        while cutoff is not None:
+            with partition.pool.write() as connection:
+                moved = archive.archive_batch(connection, cutoff, partition.decay.weight)
+            if not moved:
+                break
+            archived += moved
+
+        with partition.pool.write() as connection:
+            freed = connection.execute("PRAGMA freelist_count").fetchone()[0]
+            if connection.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                # One-off switch to incremental mode, needs a full VACUUM
+                connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                connection.execute("VACUUM")
+            else:
+                connection.execute("PRAGMA incremental_vacuum").fetchall()
+
+        return archived, freed
+
+
+class WriteQueue:
+    # Group-commits one guild's inserts: the first queued entry waits delay
+    # seconds for company, then up to batch_size entries go to disk in one
+    # transaction. Every caller still gets its own row id back.
+
+    def __init__(
+        self,
+        guild_id: int,
+        batch_size: int = WRITE_BATCH_SIZE,
+        delay: float = WRITE_BATCH_DELAY,
+    ):
+        self.guild_id = guild_id
+        self.batch_size = batch_size
+        self.delay = delay
+        self.queue = None
+        self.task = None
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None
+
+    def start(self):
+        if self.task is None:
+            self.queue = asyncio.Queue()
+            # Started by whichever command inserts first; an empty context
+            # keeps that command's metrics record out of later flushes
+            self.task = asyncio.create_task(self.run(), context=contextvars.Context())
+
+    async def close(self):
+        # Flushes everything already queued, then stops
+        if self.task is None:
+            return
+
+        await self.queue.put(None)
+        await self.task
+        self.task = None
+
+    async def submit(self, entry) -> int:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((entry, future))
+        return await future
+
+    async def run(self):
+        stopping = False
+        while not stopping:
+            item = await self.queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            await asyncio.sleep(self.delay)
+            while len(batch) < self.batch_size and not self.queue.empty():
+                item = self.queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self.flush(batch)
+
+    async def flush(self, batch):
+        try:
+            row_ids = await AsyncDB.run_write(
+                self.guild_id,
+                DB.insert_entries,
+                self.guild_id,
+                [entry for entry, _ in batch],
+            )
+        except Exception as error:
+            # Nothing was committed: insert_entries handles failures after
+            # its commit itself, so retrying can't insert an entry twice
+            if len(batch) == 1:
+                future = batch[0][1]
+                if not future.done():
+                    future.set_exception(error)
+                return
+
+            # Retry one by one so a single bad entry doesn't fail the rest
+            for item in batch:
+                await self.flush([item])
+            return
+
+        for (_, future), row_id in zip(batch, row_ids):
+            if not future.done():
+                future.set_result(row_id)
+
+
+def report_cooldown_write(guild_id: int, write):
+    # Done callback for AsyncDB.hit_cooldown's write-behind, which nobody
+    # awaits. The hit still counts in memory, it just won't survive a restart.
+    error = write.exception()
+    if error is not None:
+        print(f"Failed to persist a cooldown for guild {guild_id}: {error!r}")
+
+
+# AsyncDB methods a bot process can forward to the data service, by name.
+# Filled in by @rpc, served by data_service.DataService.
+RPC_METHODS = {}
+
+
+def rpc(func):
+    # Registers an AsyncDB method in RPC_METHODS. While AsyncDB.remote is set
+    # (a DataServiceClient) calls go to the data service instead of running here.
+    RPC_METHODS[func.__name__] = func
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        ready = AsyncDB.ready_event()
+        if not ready.is_set():
+            await ready.wait()  # Called while the database is still warming up
+        if AsyncDB.remote is not None:
+            # The round trip is this process's DB time, same as a local call
+            return await AsyncDB.timed(AsyncDB.remote.call(func.__name__, args, kwargs))
+        return await func(*args, **kwargs)
+
+    return staticmethod(wrapper)
+
+
+class AsyncDB:
+    # Awaitable versions of the DB helpers, for use inside coroutines
+
+    batching = False  # Inserts go through each guild's WriteQueue while open
+    remote = None  # DataServiceClient when another process owns the database
+    # Set once open() finishes and cleared by close(), @rpc calls wait for it.
+    # Use ready_event(): there is one per event loop, kept across reopens so
+    # coroutines already waiting are woken by the next open().
+    ready = None
+    ready_loop = None
+
+    @staticmethod
+    async def run_read(func, *args):
+        return await AsyncDB.timed(
+            asyncio.get_running_loop().run_in_executor(_read_executor, func, *args)
+        )
+
+    @staticmethod
+    async def run_write(guild_id: int, func, *args):
+        # Each guild has its own writer thread
+        partition = await AsyncDB.partition(guild_id)
+        return await AsyncDB.timed(
+            asyncio.get_running_loop().run_in_executor(
+                partition.write_executor, func, *args
             )
-            """,
-            (total,),
         )
 
-        row = cursor.fetchone()
-        return row[0] if row else 0
+    @staticmethod
+    async def timed(awaitable):
+        # Charges the wait to the DB time of the command being run, if any
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            metrics.add_db_time(time.perf_counter() - started)
+
+    @staticmethod
+    async def partition(guild_id: int) -> GuildPartition:
+        # Opening a partition migrates and loads it, do that off the loop
+        partition = partitions.by_guild.get(guild_id)
+        if partition is None:
+            partition = await AsyncDB.run_read(partitions.get, guild_id)
+        return partition
+
+    @staticmethod
+    def ready_event() -> asyncio.Event:
+        loop = asyncio.get_running_loop()
+        if AsyncDB.ready_loop is not loop:
+            AsyncDB.ready = asyncio.Event()
+            AsyncDB.ready_loop = loop
+        return AsyncDB.ready
+
+    @staticmethod
+    async def open():
+        if AsyncDB.remote is not None:
+            await AsyncDB.remote.connect()
+        else:
+            # The home guild opens up front, every other guild on first use
+            await AsyncDB.partition(HOME_GUILD_ID)
+            AsyncDB.batching = True
+        AsyncDB.ready_event().set()
 
     @staticmethod
-    def get_unique_traders_count(user_id: int) -> int:
-        db = DB("points.db")
-        cursor = db.get_cursor()
-        cursor.execute(
-            """
-            SELECT COUNT(DISTINCT author_user_id)
-            FROM reputation
-            WHERE target_user_id = ?
-            AND point_value > 0
-            """,
-            (user_id,),
+    async def close():
+        AsyncDB.ready_event().clear()
+        if AsyncDB.remote is not None:
+            await AsyncDB.remote.close()
+            return
+
+        AsyncDB.batching = False
+        for partition in partitions.opened():
+            await partition.write_queue.close()  # Pending reputation must land first
+        await AsyncDB.run_read(partitions.close)
+
+    @rpc
+    async def get_storage_stats(guild_id: int) -> dict:
+        return (await AsyncDB.partition(guild_id)).stats()
+
+    @rpc
+    async def setup_points_db(guild_id: int) -> int:
+        return await AsyncDB.run_write(guild_id, DB.setup_points_db, guild_id)
+
+    @rpc
+    async def load_rank_index(guild_id: int) -> int:
+        return await AsyncDB.run_read(DB.load_rank_index, guild_id)
+
+    @rpc
+    async def check_query_plans(guild_id: int) -> list[tuple[str, str]]:
+        return await AsyncDB.run_read(DB.check_query_plans, guild_id)
+
+    @rpc
+    async def add_entry(
+        guild_id: int,
+        target_user_id: int,
+        author_user_id: int,
+        experience_type: ExperienceType,
+        reason: str,
+    ) -> int:
+        entry = (
+            target_user_id,
+            author_user_id,
+            DB.point_value(experience_type),
+            reason,
         )
-        row = cursor.fetchone()
-        return row[0] if row and row[0] is not None else 0
+        if not AsyncDB.batching:
+            return await AsyncDB.run_write(guild_id, DB.insert_entry, guild_id, *entry)
+
+        write_queue = (await AsyncDB.partition(guild_id)).write_queue
+        write_queue.start()
+        return await AsyncDB.timed(write_queue.submit(entry))
+
+    @rpc
+    async def insert_entry(
+        guild_id: int,
+        target_user_id: int,
+        author_user_id: int,
+        point_value: int,
+        reason: str,
+    ) -> int:
+        return await AsyncDB.run_write(
+            guild_id,
+            DB.insert_entry,
+            guild_id,
+            target_user_id,
+            author_user_id,
+            point_value,
+            reason,
+        )
+
+    @rpc
+    async def delete_entry(guild_id: int, entry_id: int) -> int | None:
+        return await AsyncDB.run_write(guild_id, DB.delete_entry, guild_id, entry_id)
+
+    @rpc
+    async def delete_entries(guild_id: int, entry_ids: list[int]) -> tuple[int, int]:
+        return await AsyncDB.run_write(
+            guild_id, DB.delete_entries, guild_id, entry_ids
+        )
+
+    @rpc
+    async def delete_entry_range(
+        guild_id: int, first_id: int, last_id: int
+    ) -> tuple[int, int]:
+        return await AsyncDB.run_write(
+            guild_id, DB.delete_entry_range, guild_id, first_id, last_id
+        )
+
+    @rpc
+    async def delete_entries_by_author(
+        guild_id: int, author_user_id: int
+    ) -> tuple[int, int]:
+        return await AsyncDB.run_write(
+            guild_id, DB.delete_entries_by_author, guild_id, author_user_id
+        )
+
+    @rpc
+    async def void_entries_between(
+        guild_id: int, first_user_id: int, second_user_id: int
+    ) -> tuple[int, int]:
+        return await AsyncDB.run_write(
+            guild_id, DB.void_entries_between, guild_id, first_user_id, second_user_id
+        )
+
+    @rpc
+    async def get_leaderboard(guild_id: int, top_n: int = 10):
+        await AsyncDB.partition(guild_id)
+        return DB.get_leaderboard(guild_id, top_n)  # In memory, no need to leave the loop
+
+    @rpc
+    async def rebuild_user_totals(guild_id: int) -> int:
+        return await AsyncDB.run_write(guild_id, DB.rebuild_user_totals, guild_id)
+
+    @rpc
+    async def get_leaderboard_pages(guild_id: int, cursor, count: int, decayed: bool = False):
+        await AsyncDB.partition(guild_id)
+        # Pages come from memory, no need to leave the loop
+        return DB.get_leaderboard_pages(guild_id, cursor, count, decayed)
+
+    @rpc
+    async def get_user_totals(guild_id: int, user_id: int) -> tuple[int, int, int, int]:
+        return await AsyncDB.run_read(DB.get_user_totals, guild_id, user_id)
+
+    @rpc
+    async def get_user_rank(guild_id: int, user_id: int, decayed: bool = False) -> int:
+        await AsyncDB.partition(guild_id)
+        # In memory, no need to leave the loop
+        return DB.get_user_rank(guild_id, user_id, decayed)
+
+    @rpc
+    async def get_unique_traders_count(guild_id: int, user_id: int) -> int:
+        return await AsyncDB.run_read(DB.get_unique_traders_count, guild_id, user_id)
+
+    @rpc
+    async def get_unique_trader_counts(
+        guild_id: int, user_ids=None, minimum: int = 1
+    ) -> dict[int, int]:
+        return await AsyncDB.run_read(
+            DB.get_unique_trader_counts, guild_id, user_ids, minimum
+        )
+
+    @rpc
+    async def take_changed_users(guild_id: int) -> set[int]:
+        await AsyncDB.partition(guild_id)
+        return DB.take_changed_users(guild_id)  # In memory, no need to leave the loop
+
+    @rpc
+    async def requeue_changed_users(guild_id: int, user_ids):
+        await AsyncDB.partition(guild_id)
+        DB.requeue_changed_users(guild_id, user_ids)
+
+    @rpc
+    async def hit_cooldown(guild_id: int, limits):
+        # limits are (bucket, rate, per). Returns (0.0, None) and counts the
+        # hit when every limit has room, else (retry after, blocking limit).
+        # Decided in memory; the row only has to reach disk before a restart,
+        # so it is written behind on the guild's writer thread.
+        partition = await AsyncDB.partition(guild_id)
+        now = time.time()
+        retry_after, limit = partition.cooldowns.hit(limits, now)
+        if limit is None:
+            write = partition.write_executor.submit(
+                DB.record_cooldown,
+                guild_id,
+                [(bucket, now + per) for bucket, _, per in limits],
+                now,
+            )
+            write.add_done_callback(functools.partial(report_cooldown_write, guild_id))
+        return retry_after, limit
+
+    @rpc
+    async def search_reviews(
+        guild_id: int,
+        text: str,
+        target_user_id: int | None,
+        author_user_id: int | None,
+        limit: int,
+        offset: int = 0,
+    ):
+        return await AsyncDB.run_read(
+            DB.search_reviews,
+            guild_id,
+            text,
+            target_user_id,
+            author_user_id,
+            limit,
+            offset,
+        )
+
+    @rpc
+    async def get_ring_report(guild_id: int, min_size: int):
+        return await AsyncDB.run_read(DB.get_ring_report, guild_id, min_size)
+
+    @rpc
+    async def export_reputation(guild_id: int, path: str, fmt: str | None = None) -> int:
+        return await AsyncDB.run_read(DB.export_reputation, guild_id, path, fmt)
+
+    @rpc
+    async def import_reputation(
+        guild_id: int, path: str, fmt: str | None = None
+    ) -> tuple[int, int]:
+        # Not on the write thread: each batch takes the writer on its own,
+        # so regular writes keep landing between batches
+        return await AsyncDB.run_read(DB.import_reputation, guild_id, path, fmt)
+
+    @rpc
+    async def backup_database(guild_id: int, path: str) -> int:
+        return await AsyncDB.run_read(DB.backup_database, guild_id, path)
+
+    @rpc
+    async def archive_reputation(
+        guild_id: int, older_than_days: float = ARCHIVE_AFTER_DAYS
+    ) -> tuple[int, int]:
+        # Not on the write thread: each batch takes the writer on its own
+        return await AsyncDB.run_read(DB.archive_reputation, guild_id, older_than_days)
+
+    @rpc
+    async def get_history_page(
+        guild_id: int, user_id: int, before_id: int | None, limit: int
+    ):
+        return await AsyncDB.run_read(
+            DB.get_history_page, guild_id, user_id, before_id, limit
+        )
+
+    @rpc
+    async def get_history_count(guild_id: int, user_id: int) -> int:
+        return await AsyncDB.run_read(DB.get_history_count, guild_id, user_id)
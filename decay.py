@@ -0,0 +1,28 @@
+import time
+
+
+class DecayClock:
+    # Decayed totals are stored as sums of point_value * weight(created_at),
+    # with every entry weighted relative to a fixed epoch:
+    #     weight(t) = 2 ** ((t - epoch) / half_life)
+    # Scaling a stored total by 2 ** ((epoch - now) / half_life) gives its value
+    # right now. That factor is the same for every user, so stored totals sort
+    # in the same order as current ones and never need rewriting as time passes,
+    # only when the epoch is moved forward to keep the weights in float range.
+
+    def __init__(self, half_life: float, epoch: float = 0.0):
+        self.half_life = half_life  # seconds
+        self.epoch = epoch
+
+    def weight(self, created_at: float) -> float:
+        return 2.0 ** ((created_at - self.epoch) / self.half_life)
+
+    def current(self, stored: float, now: float | None = None) -> float:
+        if now is None:
+            now = time.time()
+        return stored * 2.0 ** ((self.epoch - now) / self.half_life)
+
+    def half_lives_elapsed(self, now: float | None = None) -> float:
+        if now is None:
+            now = time.time()
+        return (now - self.epoch) / self.half_life
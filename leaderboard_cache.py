@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+
+CACHED_PAGES = 64  # Rendered pages kept per leaderboard
+
+
+class LeaderboardPage:
+    # One rendered page of leaderboard entries after a keyset cursor, shared
+    # by every open view and small enough to send to a bot process as is
+
+    def __init__(self, start: int, entries, cursor, has_next: bool):
+        self.start = start  # 0-based position of the first entry
+        self.entries = tuple(entries)  # (user_id, points shown)
+        self.cursor = cursor  # Cursor for the page after this one, None when empty
+        self.has_next = has_next
+        self.description = "\n".join(
+            f"**{idx}.** <@{user_id}> - {points} points"
+            for idx, (user_id, points) in enumerate(self.entries, start=start + 1)
+        )
+
+
+class LeaderboardCache:
+    # Rendered leaderboard pages, built only for cursors someone asks for.
+    # Each page is cut from the live rank index when it is first asked for,
+    # so pages are only eventually consistent with each other: there is no
+    # snapshot shared between them. Keyset cursors keep page N + 1 starting
+    # right after the last entry of page N however the index moved, so only
+    # users whose own score changed in between can show up twice or not at
+    # all. Writes call invalidate(); cached pages are dropped on the next
+    # read, at most once per rebuild_interval seconds.
+
+    def __init__(self, source, display=None, per_page: int = 10, rebuild_interval: float = 5.0):
+        self.source = source  # page_after(cursor, count) of a rank index
+        self.display = display or (lambda score: score)  # Stored score -> points shown
+        self.per_page = per_page
+        self.rebuild_interval = rebuild_interval
+        self.lock = threading.Lock()
+        self.version = 0
+        self.pages = OrderedDict()  # LRU of cursor -> LeaderboardPage
+        self.pages_version = None
+        self.cleared_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self):
+        with self.lock:
+            self.version += 1
+
+    def get(self, cursor=None) -> LeaderboardPage:
+        with self.lock:
+            if self.pages_version != self.version and (
+                self.pages_version is None
+                or time.monotonic() - self.cleared_at >= self.rebuild_interval
+            ):
+                self.pages.clear()
+                self.pages_version = self.version
+                self.cleared_at = time.monotonic()
+
+            page = self.pages.get(cursor)
+            if page is not None:
+                self.hits += 1
+                self.pages.move_to_end(cursor)
+                return page
+
+            self.misses += 1
+            # One extra entry tells whether there is a page after this one
+            start, entries = self.source(cursor, self.per_page + 1)
+            shown = entries[: self.per_page]
+            page = LeaderboardPage(
+                start,
+                [(user_id, self.display(score)) for user_id, score in shown],
+                (shown[-1][1], shown[-1][0]) if shown else None,
+                len(entries) > self.per_page,
+            )
+            self.pages[cursor] = page
+            if len(self.pages) > CACHED_PAGES:
+                self.pages.popitem(last=False)
+            return page
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "leaderboard_version": self.version,
+                "leaderboard_cache_hits": self.hits,
+                "leaderboard_cache_misses": self.misses,
+            }
@@ -1,15 +1,69 @@
+from startup import profile, time_imports
 import os
+import argparse
+import asyncio
+import time
 import discord
 from discord.ext import commands
+import metrics
+from data_service import SOCKET_PATH, DataService, DataServiceClient
+from db import HOME_GUILD_ID, AsyncDB
+
+profile.add("imports", profile.started, time.perf_counter() - profile.started)
+time_imports("cogs")
 
 OWNER_ID = 923600698967461898
+METRICS_HOST = "127.0.0.1"  # Local only, scrape with Prometheus on the same host
+METRICS_PORT = 9108  # The data service or a single bot process, shards count up from it
+
+parser = argparse.ArgumentParser(description="Run the reputation bot")
+parser.add_argument(
+    "--serve-data",
+    action="store_true",
+    help="Only run the data service that sharded bot processes share, no Discord connection",
+)
+parser.add_argument(
+    "--use-data-service",
+    action="store_true",
+    help="Send every database call to a running data service instead of opening points.db",
+)
+parser.add_argument("--socket", default=SOCKET_PATH, help="Data service socket path")
+parser.add_argument(
+    "--shard-count", type=int, help="Total shards across every bot process, enables sharding"
+)
+parser.add_argument(
+    "--shard-ids", type=int, nargs="+", help="Shards this process runs (default all)"
+)
+parser.add_argument(
+    "--metrics-port",
+    type=int,
+    help=f"Default {METRICS_PORT}, or {METRICS_PORT} + 1 + the first shard id for shard processes",
+)
+args = parser.parse_args()
 
-with open("token.txt", "r") as f:
-    TOKEN = f.read().strip()
+if args.metrics_port is None:
+    # Every process on the host needs its own port. Shard ids never overlap
+    # between processes, so the first one picks a free port for each.
+    if args.shard_ids:
+        args.metrics_port = METRICS_PORT + 1 + min(args.shard_ids)
+    elif args.use_data_service:
+        args.metrics_port = METRICS_PORT + 1
+    else:
+        args.metrics_port = METRICS_PORT
 
 intents = discord.Intents.default()
+# Keeps the member cache complete, trader role sync relies on member roles
+intents.members = True
 
-client = commands.Bot(command_prefix=commands.when_mentioned, intents=intents)
+if args.shard_count or args.shard_ids:
+    client = commands.AutoShardedBot(
+        command_prefix=commands.when_mentioned,
+        intents=intents,
+        shard_count=args.shard_count,
+        shard_ids=args.shard_ids,
+    )
+else:
+    client = commands.Bot(command_prefix=commands.when_mentioned, intents=intents)
 
 
 @client.command(name="sync")
@@ -21,16 +75,107 @@ async def _sync(context: commands.Context):
         await context.reply("This command is not for you...")
 
 
+@client.command(name="dbstats")
+async def _dbstats(context: commands.Context):
+    if context.author.id != OWNER_ID:
+        await context.reply("This command is not for you...")
+        return
+
+    guild_id = context.guild.id if context.guild else HOME_GUILD_ID
+    stats = await AsyncDB.get_storage_stats(guild_id)
+    await context.reply("\n".join(f"{key}: {value}" for key, value in stats.items()))
+
+
+async def warm_up_database():
+    # Runs alongside the gateway login. Commands that arrive before it is
+    # done wait on AsyncDB.ready_event().
+    try:
+        with profile.phase("database warm-up"):
+            if args.use_data_service:
+                AsyncDB.remote = DataServiceClient(args.socket)
+            await AsyncDB.open()  # Migrates and loads the home guild, others open on first use
+            for name, detail in await AsyncDB.check_query_plans(HOME_GUILD_ID):
+                print(f"Warning: query `{name}` does a full table scan ({detail})")
+    except Exception as error:
+        print(f"Database warm-up failed, shutting down: {error!r}")
+        await client.close()  # No point staying online without a database
+        return
+
+    if args.use_data_service:
+        print(f"Connected to the data service at {args.socket}")
+    else:
+        print("Opened database connections")
+
+
 @client.event
 async def setup_hook():
-    for cog in os.listdir("cogs"):
+    profile.add_since("gateway login", "login")
+
+    for cog in sorted(os.listdir("cogs")):
         if not cog.endswith(".py"):
             continue
 
-        await client.load_extension(f"cogs.{cog[:-3]}")
+        name = f"cogs.{cog[:-3]}"
+        started = time.perf_counter()
+        await client.load_extension(name)
+        seconds = time.perf_counter() - started
+        imported = profile.imports.get(name, 0.0)
+        profile.add(f"{name} import", started, imported)
+        profile.add(f"{name} setup", started + imported, seconds - imported)
         print(f"Loaded cog `{cog}`")
 
+    with profile.phase("metrics server"):
+        metrics.instrument(client)
+        await metrics.start_server(METRICS_HOST, args.metrics_port)
+    print(f"Serving metrics on http://{METRICS_HOST}:{args.metrics_port}/metrics")
+
+
+@client.event
+async def on_ready():
+    if profile.reported:
+        return  # Reconnected
+
+    profile.add_since("gateway login until ready", "login")
+    await AsyncDB.ready_event().wait()
+    print(profile.report())
     print(f"{client.user} is now running.")
 
 
-client.run(TOKEN)
+async def serve_data():
+    service = DataService(args.socket)
+    await service.start()
+    print(f"Serving the database on {args.socket}")
+
+    await metrics.start_server(METRICS_HOST, args.metrics_port)
+    print(f"Serving metrics on http://{METRICS_HOST}:{args.metrics_port}/metrics")
+
+    try:
+        await service.serve_forever()
+    finally:
+        await service.close()
+
+
+async def main():
+    discord.utils.setup_logging()
+
+    if args.serve_data:
+        await serve_data()
+        return
+
+    with open("token.txt", "r") as f:
+        token = f.read().strip()
+
+    profile.mark("login")
+    warm_up = asyncio.create_task(warm_up_database())
+    try:
+        async with client:
+            await client.start(token)
+    finally:
+        warm_up.cancel()  # Nothing to cancel once it finished
+        await AsyncDB.close()
+
+
+try:
+    asyncio.run(main())
+except KeyboardInterrupt:
+    pass  # Shutdown already closed the client and database
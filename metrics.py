@@ -0,0 +1,226 @@
+import contextvars
+import functools
+import re
+import threading
+import time
+
+# Upper bounds in seconds, Prometheus style
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                break
+        else:
+            i = len(BUCKETS)
+        self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, fraction: float) -> float:
+        # Upper bound of the bucket holding the requested quantile
+        target = self.count * fraction
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                return BUCKETS[i] if i < len(BUCKETS) else float("inf")
+        return 0.0
+
+
+class Registry:
+    # Histograms keyed by (metric name, label value), safe to use from any thread
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+
+    def observe(self, name: str, label: str, value: float):
+        with self.lock:
+            histogram = self.histograms.get((name, label))
+            if histogram is None:
+                histogram = self.histograms[(name, label)] = Histogram()
+            histogram.observe(value)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                key: (list(h.counts), h.total, h.count, h.quantile(0.5), h.quantile(0.95))
+                for key, h in self.histograms.items()
+            }
+
+    def render(self) -> str:
+        # Prometheus text exposition format
+        lines = []
+        seen_names = set()
+        for (name, label), (counts, total, count, _, _) in sorted(self.snapshot().items()):
+            label_name = LABEL_NAMES.get(name, "name")
+            if name not in seen_names:
+                lines.append(f"# TYPE {name} histogram")
+                seen_names.add(name)
+
+            escaped = label.replace("\\", "\\\\").replace('"', '\\"')
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{name}_bucket{{{label_name}="{escaped}",le="{le}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{label_name}="{escaped}"}} {total}')
+            lines.append(f'{name}_count{{{label_name}="{escaped}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+LABEL_NAMES = {
+    "command_seconds": "command",
+    "command_time_to_defer_seconds": "command",
+    "command_db_seconds": "command",
+    "command_discord_api_seconds": "command",
+    "sql_statement_seconds": "statement",
+}
+
+
+class CommandRecord:
+    # Timings for the command running in the current task
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.time_to_defer = None
+        self.db_time = 0.0
+        self.api_time = 0.0
+
+
+current_command = contextvars.ContextVar("current_command", default=None)
+
+
+def begin_command(name: str):
+    return current_command.set(CommandRecord(name))
+
+
+def end_command(token):
+    record = current_command.get()
+    current_command.reset(token)
+    if record is None:
+        return
+
+    registry.observe("command_seconds", record.name, time.perf_counter() - record.started)
+    registry.observe("command_db_seconds", record.name, record.db_time)
+    registry.observe("command_discord_api_seconds", record.name, record.api_time)
+    if record.time_to_defer is not None:
+        registry.observe("command_time_to_defer_seconds", record.name, record.time_to_defer)
+
+
+def add_db_time(seconds: float):
+    record = current_command.get()
+    if record is not None:
+        record.db_time += seconds
+
+
+def add_api_time(seconds: float):
+    record = current_command.get()
+    if record is not None:
+        record.api_time += seconds
+
+
+def mark_first_response():
+    record = current_command.get()
+    if record is not None and record.time_to_defer is None:
+        record.time_to_defer = time.perf_counter() - record.started
+
+
+def statement_label(sql: str) -> str:
+    return re.sub(r"\s+", " ", sql).strip()[:80]
+
+
+def observe_statement(sql: str, seconds: float):
+    registry.observe("sql_statement_seconds", statement_label(sql), seconds)
+
+
+def timed_api_call(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            add_api_time(time.perf_counter() - started)
+
+    return wrapper
+
+
+def first_response(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        mark_first_response()
+        return await func(*args, **kwargs)
+
+    return wrapper
+
+
+def timed_command(name: str, callback):
+    @functools.wraps(callback)
+    async def wrapper(*args, **kwargs):
+        token = begin_command(name)
+        try:
+            return await callback(*args, **kwargs)
+        finally:
+            end_command(token)
+
+    return wrapper
+
+
+def instrument(client):
+    # Wraps every app command, prefix command and Discord HTTP call of client.
+    # Call once all cogs are loaded.
+    import discord
+    from discord.webhook.async_ import AsyncWebhookAdapter
+
+    if not getattr(discord.http.HTTPClient.request, "_timed", False):
+        for owner, attribute in (
+            (discord.http.HTTPClient, "request"),
+            (AsyncWebhookAdapter, "request"),
+        ):
+            wrapped = timed_api_call(getattr(owner, attribute))
+            wrapped._timed = True
+            setattr(owner, attribute, wrapped)
+
+        for attribute in ("defer", "send_message", "edit_message", "send_modal"):
+            response_method = getattr(discord.InteractionResponse, attribute)
+            setattr(discord.InteractionResponse, attribute, first_response(response_method))
+
+    for command in client.tree.walk_commands():
+        if isinstance(command, discord.app_commands.Command) and not getattr(
+            command._callback, "_timed", False
+        ):
+            command._callback = timed_command(command.qualified_name, command._callback)
+            command._callback._timed = True
+
+    @client.before_invoke
+    async def _begin_prefix_command(context):
+        context._metrics_token = begin_command(context.command.qualified_name)
+
+    @client.after_invoke
+    async def _end_prefix_command(context):
+        end_command(context._metrics_token)
+
+
+async def start_server(host: str, port: int):
+    from aiohttp import web
+
+    async def handle_metrics(request):
+        return web.Response(text=registry.render(), content_type="text/plain")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
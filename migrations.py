@@ -0,0 +1,628 @@
+import sqlite3
+
+# Rebuilds trade_pairs and user_totals from the raw reputation rows plus the
+# rollups of archived ones
+REBUILD_USER_TOTALS = """
+    DELETE FROM trade_pairs;
+
+    INSERT INTO trade_pairs (target_user_id, author_user_id, positive_count)
+    SELECT target_user_id, author_user_id, SUM(positive_count)
+    FROM (
+        SELECT target_user_id, author_user_id, COUNT(*) AS positive_count
+        FROM reputation
+        WHERE point_value > 0
+        GROUP BY target_user_id, author_user_id
+        UNION ALL
+        SELECT target_user_id, author_user_id, positive_count FROM archive_pairs
+    )
+    GROUP BY target_user_id, author_user_id;
+
+    DELETE FROM user_totals;
+
+    INSERT INTO user_totals (
+        user_id, total_points, positive_count, negative_count, unique_positive_authors
+    )
+    SELECT
+        user_id,
+        SUM(total_points),
+        SUM(positive_count),
+        SUM(negative_count),
+        (SELECT COUNT(*) FROM trade_pairs WHERE trade_pairs.target_user_id = combined.user_id)
+    FROM (
+        SELECT
+            target_user_id AS user_id,
+            SUM(point_value) AS total_points,
+            SUM(point_value > 0) AS positive_count,
+            SUM(point_value < 0) AS negative_count
+        FROM reputation
+        GROUP BY target_user_id
+        UNION ALL
+        SELECT user_id, total_points, positive_count, negative_count FROM archive_totals
+    ) AS combined
+    GROUP BY user_id;
+"""
+
+# Recomputes user_totals.decayed_points with the epoch and half-life stored in
+# settings. archive_totals.decayed_points has to be current already (archive.py).
+REBUILD_DECAYED_TOTALS = """
+    UPDATE user_totals SET decayed_points = sums.points
+    FROM (
+        SELECT user_id, TOTAL(points) AS points
+        FROM (
+            SELECT
+                target_user_id AS user_id,
+                point_value * pow(2.0, (created_at - decay.epoch) / decay.half_life) AS points
+            FROM reputation, (
+                SELECT
+                    (SELECT value FROM settings WHERE key = 'decay_epoch') AS epoch,
+                    (SELECT value FROM settings WHERE key = 'decay_half_life') AS half_life
+            ) AS decay
+            UNION ALL
+            SELECT user_id, decayed_points FROM archive_totals
+        )
+        GROUP BY user_id
+    ) AS sums
+    WHERE sums.user_id = user_totals.user_id;
+"""
+
+# Each entry moves the schema up one version (PRAGMA user_version).
+# Never edit an entry once it has shipped, append a new one instead.
+MIGRATIONS = [
+    # 1: base reputation table
+    """
+    CREATE TABLE IF NOT EXISTS reputation (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        target_user_id INTEGER,
+        author_user_id INTEGER,
+        point_value INTEGER, -- inferred
+        reason TEXT
+    );
+    """,
+    # 2: per-user aggregates, kept in sync by triggers so every writer
+    # (commands, manager modals, raw SQL) updates them in the same transaction
+    """
+    CREATE TABLE IF NOT EXISTS user_totals (
+        user_id INTEGER PRIMARY KEY,
+        total_points INTEGER NOT NULL DEFAULT 0,
+        positive_count INTEGER NOT NULL DEFAULT 0,
+        negative_count INTEGER NOT NULL DEFAULT 0,
+        unique_positive_authors INTEGER NOT NULL DEFAULT 0
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_user_totals_points
+    ON user_totals (total_points DESC, user_id);
+
+    CREATE TRIGGER IF NOT EXISTS reputation_totals_insert
+    AFTER INSERT ON reputation
+    BEGIN
+        INSERT INTO user_totals (user_id) VALUES (NEW.target_user_id)
+        ON CONFLICT (user_id) DO NOTHING;
+
+        UPDATE user_totals SET
+            total_points = total_points + NEW.point_value,
+            positive_count = positive_count + (NEW.point_value > 0),
+            negative_count = negative_count + (NEW.point_value < 0),
+            unique_positive_authors = unique_positive_authors + (
+                NEW.point_value > 0 AND NOT EXISTS (
+                    SELECT 1 FROM reputation
+                    WHERE target_user_id = NEW.target_user_id
+                    AND author_user_id = NEW.author_user_id
+                    AND point_value > 0
+                    AND id != NEW.id
+                )
+            )
+        WHERE user_id = NEW.target_user_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS reputation_totals_delete
+    AFTER DELETE ON reputation
+    BEGIN
+        UPDATE user_totals SET
+            total_points = total_points - OLD.point_value,
+            positive_count = positive_count - (OLD.point_value > 0),
+            negative_count = negative_count - (OLD.point_value < 0),
+            unique_positive_authors = unique_positive_authors - (
+                OLD.point_value > 0 AND NOT EXISTS (
+                    SELECT 1 FROM reputation
+                    WHERE target_user_id = OLD.target_user_id
+                    AND author_user_id = OLD.author_user_id
+                    AND point_value > 0
+                )
+            )
+        WHERE user_id = OLD.target_user_id;
+
+        DELETE FROM user_totals
+        WHERE user_id = OLD.target_user_id
+        AND NOT EXISTS (
+            SELECT 1 FROM reputation WHERE target_user_id = OLD.target_user_id
+        );
+    END;
+
+    DELETE FROM user_totals;
+
+    INSERT INTO user_totals (
+        user_id, total_points, positive_count, negative_count, unique_positive_authors
+    )
+    SELECT
+        target_user_id,
+        SUM(point_value),
+        SUM(point_value > 0),
+        SUM(point_value < 0),
+        COUNT(DISTINCT CASE WHEN point_value > 0 THEN author_user_id END)
+    FROM reputation
+    GROUP BY target_user_id;
+    """,
+    # 3: covering indexes for per-user history and the unique author lookups
+    """
+    CREATE INDEX IF NOT EXISTS idx_reputation_target_history
+    ON reputation (target_user_id, id DESC, point_value, author_user_id);
+
+    CREATE INDEX IF NOT EXISTS idx_reputation_positive_authors
+    ON reputation (target_user_id, author_user_id) WHERE point_value > 0;
+    """,
+    # 4: distinct (target, author) positive pairs, so unique trader counts
+    # change by a primary key lookup instead of probing reputation
+    """
+    CREATE TABLE IF NOT EXISTS trade_pairs (
+        target_user_id INTEGER NOT NULL,
+        author_user_id INTEGER NOT NULL,
+        positive_count INTEGER NOT NULL,
+        PRIMARY KEY (target_user_id, author_user_id)
+    ) WITHOUT ROWID;
+
+    DROP TRIGGER IF EXISTS reputation_totals_insert;
+    DROP TRIGGER IF EXISTS reputation_totals_delete;
+    DROP INDEX IF EXISTS idx_reputation_positive_authors;
+
+    CREATE TRIGGER reputation_totals_insert
+    AFTER INSERT ON reputation
+    BEGIN
+        INSERT INTO trade_pairs (target_user_id, author_user_id, positive_count)
+        SELECT NEW.target_user_id, NEW.author_user_id, 1
+        WHERE NEW.point_value > 0
+        ON CONFLICT (target_user_id, author_user_id)
+        DO UPDATE SET positive_count = positive_count + 1;
+
+        INSERT INTO user_totals (user_id) VALUES (NEW.target_user_id)
+        ON CONFLICT (user_id) DO NOTHING;
+
+        UPDATE user_totals SET
+            total_points = total_points + NEW.point_value,
+            positive_count = positive_count + (NEW.point_value > 0),
+            negative_count = negative_count + (NEW.point_value < 0),
+            unique_positive_authors = unique_positive_authors + (
+                NEW.point_value > 0 AND (
+                    SELECT positive_count FROM trade_pairs
+                    WHERE target_user_id = NEW.target_user_id
+                    AND author_user_id = NEW.author_user_id
+                ) = 1
+            )
+        WHERE user_id = NEW.target_user_id;
+    END;
+
+    CREATE TRIGGER reputation_totals_delete
+    AFTER DELETE ON reputation
+    BEGIN
+        UPDATE trade_pairs SET positive_count = positive_count - 1
+        WHERE OLD.point_value > 0
+        AND target_user_id = OLD.target_user_id
+        AND author_user_id = OLD.author_user_id;
+
+        UPDATE user_totals SET
+            total_points = total_points - OLD.point_value,
+            positive_count = positive_count - (OLD.point_value > 0),
+            negative_count = negative_count - (OLD.point_value < 0),
+            unique_positive_authors = unique_positive_authors - (
+                OLD.point_value > 0 AND (
+                    SELECT positive_count FROM trade_pairs
+                    WHERE target_user_id = OLD.target_user_id
+                    AND author_user_id = OLD.author_user_id
+                ) = 0
+            )
+        WHERE user_id = OLD.target_user_id;
+
+        DELETE FROM trade_pairs
+        WHERE target_user_id = OLD.target_user_id
+        AND author_user_id = OLD.author_user_id
+        AND positive_count <= 0;
+
+        DELETE FROM user_totals
+        WHERE user_id = OLD.target_user_id
+        AND NOT EXISTS (
+            SELECT 1 FROM reputation WHERE target_user_id = OLD.target_user_id
+        );
+    END;
+
+    DELETE FROM trade_pairs;
+
+    INSERT INTO trade_pairs (target_user_id, author_user_id, positive_count)
+    SELECT target_user_id, author_user_id, COUNT(*)
+    FROM reputation
+    WHERE point_value > 0
+    GROUP BY target_user_id, author_user_id;
+
+    DELETE FROM user_totals;
+
+    INSERT INTO user_totals (
+        user_id, total_points, positive_count, negative_count, unique_positive_authors
+    )
+    SELECT
+        target_user_id,
+        SUM(point_value),
+        SUM(point_value > 0),
+        SUM(point_value < 0),
+        (SELECT COUNT(*) FROM trade_pairs WHERE trade_pairs.target_user_id = reputation.target_user_id)
+    FROM reputation
+    GROUP BY target_user_id;
+    """,
+    # 5: entries by author, for bulk moderation
+    """
+    CREATE INDEX IF NOT EXISTS idx_reputation_author
+    ON reputation (author_user_id, target_user_id);
+    """,
+    # 6: full-text index over review text, kept in sync by triggers
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS reputation_fts USING fts5(
+        reason,
+        content = 'reputation',
+        content_rowid = 'id',
+        tokenize = 'unicode61 remove_diacritics 2'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS reputation_fts_insert
+    AFTER INSERT ON reputation
+    BEGIN
+        INSERT INTO reputation_fts (rowid, reason) VALUES (NEW.id, NEW.reason);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS reputation_fts_delete
+    AFTER DELETE ON reputation
+    BEGIN
+        INSERT INTO reputation_fts (reputation_fts, rowid, reason)
+        VALUES ('delete', OLD.id, OLD.reason);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS reputation_fts_update
+    AFTER UPDATE OF reason ON reputation
+    BEGIN
+        INSERT INTO reputation_fts (reputation_fts, rowid, reason)
+        VALUES ('delete', OLD.id, OLD.reason);
+        INSERT INTO reputation_fts (rowid, reason) VALUES (NEW.id, NEW.reason);
+    END;
+
+    INSERT INTO reputation_fts (reputation_fts) VALUES ('rebuild');
+    """,
+    # 7: entry timestamps and a time-decayed total per user (see decay.py).
+    # The triggers call rep_weight(), which the bot registers on its connections
+    # (replaced by plain SQL in migration 11).
+    """
+    CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY,
+        value NOT NULL
+    ) WITHOUT ROWID;
+
+    ALTER TABLE reputation ADD COLUMN created_at REAL;
+    -- Older entries were never timestamped, count them from today
+    UPDATE reputation SET created_at = (julianday('now') - 2440587.5) * 86400.0;
+
+    ALTER TABLE user_totals ADD COLUMN decayed_points REAL NOT NULL DEFAULT 0;
+
+    DROP TRIGGER IF EXISTS reputation_totals_insert;
+    DROP TRIGGER IF EXISTS reputation_totals_delete;
+
+    CREATE TRIGGER reputation_totals_insert
+    AFTER INSERT ON reputation
+    BEGIN
+        INSERT INTO trade_pairs (target_user_id, author_user_id, positive_count)
+        SELECT NEW.target_user_id, NEW.author_user_id, 1
+        WHERE NEW.point_value > 0
+        ON CONFLICT (target_user_id, author_user_id)
+        DO UPDATE SET positive_count = positive_count + 1;
+
+        INSERT INTO user_totals (user_id) VALUES (NEW.target_user_id)
+        ON CONFLICT (user_id) DO NOTHING;
+
+        UPDATE user_totals SET
+            total_points = total_points + NEW.point_value,
+            positive_count = positive_count + (NEW.point_value > 0),
+            negative_count = negative_count + (NEW.point_value < 0),
+            unique_positive_authors = unique_positive_authors + (
+                NEW.point_value > 0 AND (
+                    SELECT positive_count FROM trade_pairs
+                    WHERE target_user_id = NEW.target_user_id
+                    AND author_user_id = NEW.author_user_id
+                ) = 1
+            ),
+            decayed_points = decayed_points
+                + NEW.point_value * rep_weight(NEW.created_at)
+        WHERE user_id = NEW.target_user_id;
+    END;
+
+    CREATE TRIGGER reputation_totals_delete
+    AFTER DELETE ON reputation
+    BEGIN
+        UPDATE trade_pairs SET positive_count = positive_count - 1
+        WHERE OLD.point_value > 0
+        AND target_user_id = OLD.target_user_id
+        AND author_user_id = OLD.author_user_id;
+
+        UPDATE user_totals SET
+            total_points = total_points - OLD.point_value,
+            positive_count = positive_count - (OLD.point_value > 0),
+            negative_count = negative_count - (OLD.point_value < 0),
+            unique_positive_authors = unique_positive_authors - (
+                OLD.point_value > 0 AND (
+                    SELECT positive_count FROM trade_pairs
+                    WHERE target_user_id = OLD.target_user_id
+                    AND author_user_id = OLD.author_user_id
+                ) = 0
+            ),
+            decayed_points = decayed_points
+                - OLD.point_value * rep_weight(OLD.created_at)
+        WHERE user_id = OLD.target_user_id;
+
+        DELETE FROM trade_pairs
+        WHERE target_user_id = OLD.target_user_id
+        AND author_user_id = OLD.author_user_id
+        AND positive_count <= 0;
+
+        DELETE FROM user_totals
+        WHERE user_id = OLD.target_user_id
+        AND NOT EXISTS (
+            SELECT 1 FROM reputation WHERE target_user_id = OLD.target_user_id
+        );
+    END;
+    """,
+    # 8: bulk imports set settings.defer_fts inside their transaction and index
+    # a whole batch of review text at once, which is much cheaper than per row
+    """
+    DROP TRIGGER IF EXISTS reputation_fts_insert;
+
+    CREATE TRIGGER reputation_fts_insert
+    AFTER INSERT ON reputation
+    WHEN NOT EXISTS (SELECT 1 FROM settings WHERE key = 'defer_fts')
+    BEGIN
+        INSERT INTO reputation_fts (rowid, reason) VALUES (NEW.id, NEW.reason);
+    END;
+    """,
+    # 9: archive of old entries (see archive.py). Archived rows leave reputation
+    # but keep counting in user_totals and trade_pairs: the delete trigger stands
+    # down while settings.archiving exists, and the rollups let rebuilds add
+    # archived entries back in.
+    """
+    CREATE TABLE IF NOT EXISTS reputation_archive (
+        id INTEGER PRIMARY KEY,
+        target_user_id INTEGER NOT NULL,
+        first_id INTEGER NOT NULL,
+        last_id INTEGER NOT NULL,
+        row_count INTEGER NOT NULL,
+        data BLOB NOT NULL -- zlib compressed JSON rows, newest first
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_reputation_archive_target
+    ON reputation_archive (target_user_id, first_id);
+
+    CREATE TABLE IF NOT EXISTS archive_totals (
+        user_id INTEGER PRIMARY KEY,
+        total_points INTEGER NOT NULL DEFAULT 0,
+        positive_count INTEGER NOT NULL DEFAULT 0,
+        negative_count INTEGER NOT NULL DEFAULT 0,
+        entry_count INTEGER NOT NULL DEFAULT 0,
+        decayed_points REAL NOT NULL DEFAULT 0
+    );
+
+    CREATE TABLE IF NOT EXISTS archive_pairs (
+        target_user_id INTEGER NOT NULL,
+        author_user_id INTEGER NOT NULL,
+        positive_count INTEGER NOT NULL,
+        PRIMARY KEY (target_user_id, author_user_id)
+    ) WITHOUT ROWID;
+
+    CREATE INDEX IF NOT EXISTS idx_reputation_created ON reputation (created_at);
+
+    DROP TRIGGER IF EXISTS reputation_totals_delete;
+
+    CREATE TRIGGER reputation_totals_delete
+    AFTER DELETE ON reputation
+    WHEN NOT EXISTS (SELECT 1 FROM settings WHERE key = 'archiving')
+    BEGIN
+        UPDATE trade_pairs SET positive_count = positive_count - 1
+        WHERE OLD.point_value > 0
+        AND target_user_id = OLD.target_user_id
+        AND author_user_id = OLD.author_user_id;
+
+        UPDATE user_totals SET
+            total_points = total_points - OLD.point_value,
+            positive_count = positive_count - (OLD.point_value > 0),
+            negative_count = negative_count - (OLD.point_value < 0),
+            unique_positive_authors = unique_positive_authors - (
+                OLD.point_value > 0 AND (
+                    SELECT positive_count FROM trade_pairs
+                    WHERE target_user_id = OLD.target_user_id
+                    AND author_user_id = OLD.author_user_id
+                ) = 0
+            ),
+            decayed_points = decayed_points
+                - OLD.point_value * rep_weight(OLD.created_at)
+        WHERE user_id = OLD.target_user_id;
+
+        DELETE FROM trade_pairs
+        WHERE target_user_id = OLD.target_user_id
+        AND author_user_id = OLD.author_user_id
+        AND positive_count <= 0;
+
+        DELETE FROM user_totals
+        WHERE user_id = OLD.target_user_id
+        AND NOT EXISTS (
+            SELECT 1 FROM reputation WHERE target_user_id = OLD.target_user_id
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM archive_totals WHERE user_id = OLD.target_user_id
+        );
+    END;
+    """,
+    # 10: sliding-window cooldown hits (see cooldowns.py), one row per hit
+    # that still counts, swept once expired
+    """
+    CREATE TABLE IF NOT EXISTS cooldowns (
+        bucket TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_cooldowns_expires ON cooldowns (expires_at);
+    """,
+    # 11: the totals triggers weight entries in plain SQL from the epoch and
+    # half-life in settings, so any connection can write to reputation (needs
+    # SQLite's math functions, in every build since 3.35). Entries that
+    # migration 7 stamped with the day it ran are spread by id between
+    # 2022-11-29 (the home server's creation) and that day, and the stored
+    # half-life is dropped so the next start recomputes every decayed total.
+    """
+    DROP TRIGGER IF EXISTS reputation_totals_insert;
+    DROP TRIGGER IF EXISTS reputation_totals_delete;
+
+    CREATE TRIGGER reputation_totals_insert
+    AFTER INSERT ON reputation
+    BEGIN
+        INSERT INTO trade_pairs (target_user_id, author_user_id, positive_count)
+        SELECT NEW.target_user_id, NEW.author_user_id, 1
+        WHERE NEW.point_value > 0
+        ON CONFLICT (target_user_id, author_user_id)
+        DO UPDATE SET positive_count = positive_count + 1;
+
+        INSERT INTO user_totals (user_id) VALUES (NEW.target_user_id)
+        ON CONFLICT (user_id) DO NOTHING;
+
+        UPDATE user_totals SET
+            total_points = total_points + NEW.point_value,
+            positive_count = positive_count + (NEW.point_value > 0),
+            negative_count = negative_count + (NEW.point_value < 0),
+            unique_positive_authors = unique_positive_authors + (
+                NEW.point_value > 0 AND (
+                    SELECT positive_count FROM trade_pairs
+                    WHERE target_user_id = NEW.target_user_id
+                    AND author_user_id = NEW.author_user_id
+                ) = 1
+            ),
+            -- Adds nothing before the first start stores an epoch, that
+            -- start recomputes every decayed total anyway
+            decayed_points = decayed_points + COALESCE(
+                NEW.point_value * pow(
+                    2.0,
+                    (NEW.created_at - (SELECT value FROM settings WHERE key = 'decay_epoch'))
+                    / (SELECT value FROM settings WHERE key = 'decay_half_life')
+                ),
+                0.0
+            )
+        WHERE user_id = NEW.target_user_id;
+    END;
+
+    CREATE TRIGGER reputation_totals_delete
+    AFTER DELETE ON reputation
+    WHEN NOT EXISTS (SELECT 1 FROM settings WHERE key = 'archiving')
+    BEGIN
+        UPDATE trade_pairs SET positive_count = positive_count - 1
+        WHERE OLD.point_value > 0
+        AND target_user_id = OLD.target_user_id
+        AND author_user_id = OLD.author_user_id;
+
+        UPDATE user_totals SET
+            total_points = total_points - OLD.point_value,
+            positive_count = positive_count - (OLD.point_value > 0),
+            negative_count = negative_count - (OLD.point_value < 0),
+            unique_positive_authors = unique_positive_authors - (
+                OLD.point_value > 0 AND (
+                    SELECT positive_count FROM trade_pairs
+                    WHERE target_user_id = OLD.target_user_id
+                    AND author_user_id = OLD.author_user_id
+                ) = 0
+            ),
+            decayed_points = decayed_points - COALESCE(
+                OLD.point_value * pow(
+                    2.0,
+                    (OLD.created_at - (SELECT value FROM settings WHERE key = 'decay_epoch'))
+                    / (SELECT value FROM settings WHERE key = 'decay_half_life')
+                ),
+                0.0
+            )
+        WHERE user_id = OLD.target_user_id;
+
+        DELETE FROM trade_pairs
+        WHERE target_user_id = OLD.target_user_id
+        AND author_user_id = OLD.author_user_id
+        AND positive_count <= 0;
+
+        DELETE FROM user_totals
+        WHERE user_id = OLD.target_user_id
+        AND NOT EXISTS (
+            SELECT 1 FROM reputation WHERE target_user_id = OLD.target_user_id
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM archive_totals WHERE user_id = OLD.target_user_id
+        );
+    END;
+
+    -- Migration 7 gave every older entry the same stamp, so it is the stamp
+    -- of the lowest id when more than one entry shares it and it predates
+    -- the first decay epoch, which the first start after migration 7 stored.
+    -- Files created after migration 7 only ever have entries after that.
+    UPDATE reputation SET created_at = 1669720103.0
+        + (legacy.stamp - 1669720103.0)
+        * (reputation.id - legacy.first_id) / (legacy.last_id - legacy.first_id + 1.0)
+    FROM (
+        SELECT created_at AS stamp, MIN(id) AS first_id, MAX(id) AS last_id
+        FROM reputation
+        WHERE created_at = (SELECT created_at FROM reputation ORDER BY id LIMIT 1)
+        GROUP BY created_at
+        HAVING COUNT(*) > 1 AND created_at > 1669720103.0 AND created_at <= COALESCE(
+            (SELECT value FROM settings WHERE key = 'decay_epoch'), created_at
+        )
+    ) AS legacy
+    WHERE reputation.created_at = legacy.stamp;
+
+    DELETE FROM settings WHERE key = 'decay_half_life';
+    """,
+    # 12: search and moderation over archived entries. archive_entries maps
+    # each archived id to its chunk with the columns filters need, and
+    # archive_fts indexes the review text without storing it (the text stays
+    # compressed in the chunk). Both are filled by archive.py; files already
+    # holding chunks get them indexed on the next start (settings.index_archive).
+    """
+    CREATE TABLE IF NOT EXISTS archive_entries (
+        id INTEGER PRIMARY KEY,
+        chunk_id INTEGER NOT NULL,
+        target_user_id INTEGER NOT NULL,
+        author_user_id INTEGER NOT NULL,
+        point_value INTEGER NOT NULL
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_archive_entries_author
+    ON archive_entries (author_user_id, target_user_id);
+
+    CREATE VIRTUAL TABLE IF NOT EXISTS archive_fts USING fts5(
+        reason,
+        content = '',
+        tokenize = 'unicode61 remove_diacritics 2'
+    );
+
+    INSERT INTO settings (key, value)
+    SELECT 'index_archive', 1 WHERE EXISTS (SELECT 1 FROM reputation_archive);
+    """,
+]
+
+
+def get_schema_version(connection: sqlite3.Connection) -> int:
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(connection: sqlite3.Connection) -> int:
+    # Applies every pending migration, each in its own transaction
+    version = get_schema_version(connection)
+
+    for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+        connection.executescript(
+            f"BEGIN;\n{script}\nPRAGMA user_version = {number};\nCOMMIT;"
+        )
+        print(f"Applied database migration {number}")
+
+    return get_schema_version(connection)
@@ -0,0 +1,85 @@
+import os
+
+import discord
+
+AUTOREPLY_COLOR = 0x237FEB
+
+# Prefix commands that reply with one fixed embed, mentioning the user passed
+# to them if any. Adding an entry here is all a new autoreply needs.
+AUTOREPLIES = [
+    {
+        "name": "customot",
+        "aliases": ["cot"],
+        "description": "Display CustomOT Tutorial",
+        "title": "How To Make a Custom OT Pokemon",
+        "text": "1. To customize the original trainer name or OT, the Pokemon needs to be in Pokemon Go. \n2. You must then change your Pokemon Home name on the mobile app to whatever OT you require. \n\nNote: It is recommended to restart Pokemon Go after this before transferring as Pokemon Home may be slow to register any changes.",
+    },
+    {
+        "name": "stamp",
+        "description": "Display Difference Between Pokemon Go Stamp and Pokemon Go Origin Marker",
+        "title": "The Pokemon Go Stamp and Pokemon Go Origin Marker are NOT the same.",
+        "text": "The stamp shows the game that the pokemon was last in before being transferred to home.\nThis is important because pokemon cannot obtain the stamp once lost, but hacked pokemon **may** have the origin marker.",
+        "image": "https://i.imgur.com/PZKnD5p.jpg",
+    },
+    {
+        "name": "crosspost",
+        "aliases": ["crossp"],
+        "description": "Warns users not to crosspost",
+        "title": "❗️Do not post your request in more than one channel",
+        "text": "Please give it some time before requesting again depending on the length of your demand.\n\n*Refrain from crossposting again. Thank you for understanding.*",
+    },
+    {
+        "name": "tradechannels",
+        "aliases": ["tc"],
+        "description": "Tells users where the trade channels are",
+        "title": "❗️ This is not a trade channel",
+        "text": """Click below and please repost your request in one of the following locations:
+
+Trade Hub 1: <#1341162683734425631>
+Trade Hub 2: <#1341162764701536398>
+Shiny Trade: <#1047110840735768636>
+
+Alternatively, For different games, we have the following:
+
+Legends ZA: <#1428946618392252416>
+Legends Arceus: <#1070473675289133116>
+Brilliant Diamond/Shining Pearl: <#1070473596302012507>
+Sword and Shield: <#1070427983367651348>
+Pokemon Let's Go: <#1070473752695021598>""",
+    },
+]
+
+
+def build_autoreply_embed(autoreply: dict) -> discord.Embed:
+    embed = discord.Embed(
+        title=autoreply["title"],
+        color=autoreply.get("color", AUTOREPLY_COLOR),
+        description=autoreply["text"],
+    )
+    if autoreply.get("image"):
+        embed.set_image(url=autoreply["image"])
+    return embed
+
+
+class FileEmbed:
+    # Embed whose description is a text file, one stripped line per line.
+    # Rebuilt only when the file's mtime changes, so edits show up without
+    # a restart and unchanged files are never read again.
+
+    def __init__(self, path: str, title: str, color: discord.Color):
+        self.path = path
+        self.title = title
+        self.color = color
+        self.mtime = None
+        self.embed = None
+
+    def get(self) -> discord.Embed:
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self.mtime:
+            with open(self.path, "r") as f:
+                description = "\n".join(line.strip() for line in f)
+            self.embed = discord.Embed(
+                color=self.color, title=self.title, description=description
+            )
+            self.mtime = mtime
+        return self.embed
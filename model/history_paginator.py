@@ -1,32 +1,61 @@
+from collections import OrderedDict
+
 import discord
+from db import AsyncDB
+
+CACHED_PAGES = 5  # Visited pages kept per view
 
 
 class HistoryPaginator(discord.ui.View):
     def __init__(
-        self, db_instance, entries, member, total_points, unique_users, per_page=10
+        self, guild_id, member, total_points, unique_users, entry_count, per_page=10
     ):
         super().__init__(timeout=60)
-        self.db = db_instance  # store the DB instance
-        self.entries = entries
+        self.guild_id = guild_id
         self.member = member
         self.per_page = per_page
         self.total_points = total_points
         self.unique_users = unique_users
         self.current_page = 0
-        self.max_page = (len(entries) - 1) // per_page
+        self.max_page = max((entry_count - 1) // per_page, 0)
+        self.page_entries = []
+        # before_ids[n] is the id the n-th page starts below, None for the newest
+        self.before_ids = [None]
+        self.pages = OrderedDict()  # LRU of page number -> rows
 
-        self.prev_button.disabled = self.max_page <= 0
-        self.next_button.disabled = self.max_page <= 0
+    async def load_page(self, page: int):
+        rows = self.pages.get(page)
+        if rows is None:
+            rows = await AsyncDB.get_history_page(
+                self.guild_id, self.member.id, self.before_ids[page], self.per_page
+            )
+            self.pages[page] = rows
+            if len(self.pages) > CACHED_PAGES:
+                self.pages.popitem(last=False)
+        else:
+            self.pages.move_to_end(page)
 
-    def get_page_embed(self):
-        start = self.current_page * self.per_page
-        end = start + self.per_page
-        page_entries = self.entries[start:end]
+        if not rows and page > 0:
+            # Entries were deleted or archived since the view opened, so this
+            # page no longer exists. End the view on the page before it.
+            del self.pages[page]
+            self.max_page = page - 1
+            await self.load_page(page - 1)
+            return
 
+        if rows and len(self.before_ids) == page + 1:
+            self.before_ids.append(rows[-1][0])
+
+        self.current_page = page
+        self.page_entries = rows
+        self.prev_button.disabled = page <= 0
+        self.next_button.disabled = page >= self.max_page
+
+    def get_page_embed(self):
         description_lines = [
             f"**Total Reputation:** {self.total_points}\n**Unique Traders**: {self.unique_users}\n"
         ]
-        for points, reason, author_id in page_entries:
+        for _, points, reason, author_id in self.page_entries:
             description_lines.append(
                 f"{points:+d} | By <@{author_id}> | Review: {reason}"
             )
@@ -44,7 +73,7 @@ class HistoryPaginator(discord.ui.View):
         self, interaction: discord.Interaction, button: discord.ui.Button
     ):
         if self.current_page > 0:
-            self.current_page -= 1
+            await self.load_page(self.current_page - 1)
             await interaction.response.edit_message(
                 embed=self.get_page_embed(), view=self
             )
@@ -54,7 +83,7 @@ class HistoryPaginator(discord.ui.View):
         self, interaction: discord.Interaction, button: discord.ui.Button
     ):
         if self.current_page < self.max_page:
-            self.current_page += 1
+            await self.load_page(self.current_page + 1)
             await interaction.response.edit_message(
                 embed=self.get_page_embed(), view=self
             )
@@ -1,31 +1,50 @@
 import discord
-from db import DB
+from db import AsyncDB
 
 
 class LeaderboardPaginator(discord.ui.View):
-    def __init__(self, per_page=10):
+    def __init__(self, guild_id, decayed=False, title="Reputation Leaderboard"):
         super().__init__(timeout=120)
-        self.per_page = per_page
+        self.guild_id = guild_id
+        self.decayed = decayed
+        self.title = title
         self.current_page = 0
-        self.entries = DB.get_leaderboard(top_n=1000)
-        self.max_page = max((len(self.entries) - 1) // self.per_page, 0)
-        self.prev_button.disabled = self.max_page <= 0
-        self.next_button.disabled = self.max_page <= 0
+        # cursors[n] is the (score, user_id) just before page n
+        self.cursors = [None]
+        self.page = None  # Shared LeaderboardPage being shown
+        self.next_page = None  # Prefetched page after it
 
-    def get_page_embed(self):
-        start = self.current_page * self.per_page
-        end = start + self.per_page
-        page_entries = self.entries[start:end]
+    async def load_page(self, page: int):
+        # Fetches this page and prefetches the next one in a single call
+        pages = await AsyncDB.get_leaderboard_pages(
+            self.guild_id, self.cursors[page], 2, self.decayed
+        )
+        self.show(page, pages[0])
+        self.next_page = pages[1] if len(pages) > 1 else None
+
+    async def prefetch(self):
+        self.next_page = None
+        if self.page.has_next:
+            (self.next_page,) = await AsyncDB.get_leaderboard_pages(
+                self.guild_id, self.page.cursor, 1, self.decayed
+            )
 
+    def show(self, page: int, leaderboard_page):
+        self.current_page = page
+        self.page = leaderboard_page
+        del self.cursors[page + 1 :]
+        if leaderboard_page.cursor is not None:
+            self.cursors.append(leaderboard_page.cursor)
+        self.prev_button.disabled = page <= 0
+        self.next_button.disabled = not leaderboard_page.has_next
+
+    def get_page_embed(self):
         embed = discord.Embed(
-            title="Reputation Leaderboard",
+            title=self.title,
             color=discord.Color.blurple(),
+            description=self.page.description,
         )
-        description_lines = []
-        for idx, (user_id, points) in enumerate(page_entries, start=start + 1):
-            description_lines.append(f"**{idx}.** <@{user_id}> - {points} points")
-        embed.description = "\n".join(description_lines)
-        embed.set_footer(text=f"Page {self.current_page + 1}/{self.max_page + 1}")
+        embed.set_footer(text=f"Page {self.current_page + 1}")
         return embed
 
     @discord.ui.button(label="Previous", style=discord.ButtonStyle.blurple)
@@ -33,7 +52,7 @@ class LeaderboardPaginator(discord.ui.View):
         self, interaction: discord.Interaction, button: discord.ui.Button
     ):
         if self.current_page > 0:
-            self.current_page -= 1
+            await self.load_page(self.current_page - 1)
             await interaction.response.edit_message(
                 embed=self.get_page_embed(), view=self
             )
@@ -42,8 +61,17 @@ class LeaderboardPaginator(discord.ui.View):
     async def next_button(
         self, interaction: discord.Interaction, button: discord.ui.Button
     ):
-        if self.current_page < self.max_page:
-            self.current_page += 1
+        if not self.page.has_next:
+            return
+
+        if self.next_page is None:
+            await self.load_page(self.current_page + 1)
             await interaction.response.edit_message(
                 embed=self.get_page_embed(), view=self
             )
+            return
+
+        # Answer with the prefetched page, then fetch the one after it
+        self.show(self.current_page + 1, self.next_page)
+        await interaction.response.edit_message(embed=self.get_page_embed(), view=self)
+        await self.prefetch()
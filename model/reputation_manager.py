@@ -1,60 +1,91 @@
 import discord
+from db import AsyncDB
 
 
 # ----- Reputation Manager View -----
 class ReputationManager(discord.ui.View):
-    def __init__(self, db_instance, member, per_page=5):
+    def __init__(self, guild_id, member, entry_count, unique_users, per_page=5):
         super().__init__(timeout=120)
-        self.db = db_instance
+        self.guild_id = guild_id
         self.member = member
         self.per_page = per_page
         self.current_page = 0
-        self.entries = []
-        self.max_page = 0
-        # Load initial entries from DB
-        self.refresh_entries_sync()
+        self.entry_count = entry_count
+        self.unique_users = unique_users
+        self.entries = []  # Only the page on screen is kept
+        # before_ids[n] is the id the n-th page starts below, None for the newest
+        self.before_ids = [None]
+        self.update_max_page()
         self.update_buttons()
 
-    def refresh_entries_sync(self):
-        """Synchronous fetch of entries for init."""
-        cursor = self.db.get_cursor()
-        cursor.execute(
-            "SELECT id, point_value, reason, author_user_id FROM reputation "
-            "WHERE target_user_id = ? ORDER BY id DESC",
-            (self.member.id,),
+    async def load_page(self, page: int):
+        """Fetch one page of entries, newest first."""
+        if page == self.current_page + 1 and self.entries:
+            before_id = self.entries[-1][0]
+        else:
+            before_id = self.before_ids[page]
+
+        del self.before_ids[page:]
+        self.before_ids.append(before_id)
+        self.entries = await AsyncDB.get_history_page(
+            self.guild_id, self.member.id, before_id, self.per_page
         )
-        self.entries = cursor.fetchall()
-        self.max_page = max((len(self.entries) - 1) // self.per_page, 0)
-        self.current_page = min(self.current_page, self.max_page)
-        self.unique_users = len(set(entry[3] for entry in self.entries if entry[1] > 0))
-
-    async def refresh_entries(self):
-        """Async-friendly refresh."""
-        cursor = self.db.get_cursor()
-        cursor.execute(
-            "SELECT id, point_value, reason, author_user_id FROM reputation "
-            "WHERE target_user_id = ? ORDER BY id DESC",
-            (self.member.id,),
-        )
-        self.entries = cursor.fetchall()
-        self.max_page = max((len(self.entries) - 1) // self.per_page, 0)
-        self.current_page = min(self.current_page, self.max_page)
-        self.unique_users = len(set(entry[3] for entry in self.entries if entry[1] > 0))
+        self.current_page = page
         self.update_buttons()
 
+    async def entry_added(self, entry):
+        """Patch the window after a new (id, points, reason, author) entry."""
+        self.entry_count += 1
+        if self.current_page == 0:
+            # New ids are always the newest, so they land on top of page 0
+            self.entries = [entry] + self.entries[: self.per_page - 1]
+        await self.entry_changed()
+
+    async def entry_deleted(self, entry_id: int):
+        """Patch the window after an entry of this member was deleted."""
+        self.entry_count -= 1
+        remaining = [entry for entry in self.entries if entry[0] != entry_id]
+
+        if len(remaining) < len(self.entries):
+            # Pull up the next entry so the page stays full
+            remaining += await AsyncDB.get_history_page(
+                self.guild_id, self.member.id, self.entries[-1][0], 1
+            )
+        self.entries = remaining
+
+        if not self.entries and self.current_page > 0:
+            await self.load_page(self.current_page - 1)
+        await self.entry_changed()
+
+    async def reload(self):
+        """Re-read everything once after a bulk change, back on page 0."""
+        self.entry_count = await AsyncDB.get_history_count(
+            self.guild_id, self.member.id
+        )
+        await self.load_page(0)
+        await self.entry_changed()
+
+    async def entry_changed(self):
+        self.unique_users = await AsyncDB.get_unique_traders_count(
+            self.guild_id, self.member.id
+        )
+        self.update_max_page()
+        self.update_buttons()
+
+    def update_max_page(self):
+        self.max_page = max((self.entry_count - 1) // self.per_page, 0)
+        self.current_page = min(self.current_page, self.max_page)
+
     def update_buttons(self):
         self.prev_button.disabled = self.current_page == 0
-        self.next_button.disabled = self.current_page == self.max_page
+        self.next_button.disabled = self.current_page >= self.max_page
 
     def get_page_embed(self):
-        start = self.current_page * self.per_page
-        end = start + self.per_page
-        page_entries = self.entries[start:end]
-
         description_lines = [
             f"**Managing Reputation for {self.member.display_name}**\n"
+            + f"**Unique Traders**: {self.unique_users}\n"
         ]
-        for entry_id, points, reason, author_id in page_entries:
+        for entry_id, points, reason, author_id in self.entries:
             description_lines.append(
                 f"ID: {entry_id} | Points: {points:+d} | Author: <@{author_id}> | Review: {reason}"
             )
@@ -73,16 +104,14 @@ class ReputationManager(discord.ui.View):
     async def prev_button(
         self, interaction: discord.Interaction, button: discord.ui.Button
     ):
-        self.current_page = max(self.current_page - 1, 0)
-        self.update_buttons()
+        await self.load_page(max(self.current_page - 1, 0))
         await interaction.response.edit_message(embed=self.get_page_embed(), view=self)
 
     @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
     async def next_button(
         self, interaction: discord.Interaction, button: discord.ui.Button
     ):
-        self.current_page = min(self.current_page + 1, self.max_page)
-        self.update_buttons()
+        await self.load_page(min(self.current_page + 1, self.max_page))
         await interaction.response.edit_message(embed=self.get_page_embed(), view=self)
 
     # ----- Delete Entry Button -----
@@ -99,6 +128,13 @@ class ReputationManager(discord.ui.View):
     ):
         await interaction.response.send_modal(AddEntryModal(self))
 
+    # ----- Bulk Delete Button -----
+    @discord.ui.button(label="Bulk Delete", style=discord.ButtonStyle.danger)
+    async def bulk_delete(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ):
+        await interaction.response.send_modal(BulkDeleteModal(self))
+
 
 # ----- Modal for Deleting Entries -----
 class DeleteEntryModal(discord.ui.Modal, title="Delete Reputation Entry"):
@@ -116,12 +152,12 @@ class DeleteEntryModal(discord.ui.Modal, title="Delete Reputation Entry"):
         self.add_item(self.entry_id)
 
     async def on_submit(self, interaction: discord.Interaction):
-        cursor = self.manager_view.db.get_cursor()
-        cursor.execute(
-            "DELETE FROM reputation WHERE id = ?", (int(self.entry_id.value),)
+        entry_id = int(self.entry_id.value)
+        target_user_id = await AsyncDB.delete_entry(
+            self.manager_view.guild_id, entry_id
         )
-        self.manager_view.db.get_connection().commit()
-        await self.manager_view.refresh_entries()
+        if target_user_id == self.manager_view.member.id:
+            await self.manager_view.entry_deleted(entry_id)
         await interaction.response.edit_message(
             embed=self.manager_view.get_page_embed(), view=self.manager_view
         )
@@ -160,19 +196,112 @@ class AddEntryModal(discord.ui.Modal, title="Add Reputation Entry"):
         self.add_item(self.reason)
 
     async def on_submit(self, interaction: discord.Interaction):
-        cursor = self.manager_view.db.get_cursor()
-        cursor.execute(
-            "INSERT INTO reputation (target_user_id, author_user_id, point_value, reason) "
-            "VALUES (?, ?, ?, ?)",
-            (
-                int(self.target_user_id.value),
-                interaction.user.id,
-                int(self.point_value.value),
-                self.reason.value,
-            ),
+        target_user_id = int(self.target_user_id.value)
+        point_value = int(self.point_value.value)
+        entry_id = await AsyncDB.insert_entry(
+            self.manager_view.guild_id,
+            target_user_id,
+            interaction.user.id,
+            point_value,
+            self.reason.value,
         )
-        self.manager_view.db.get_connection().commit()
-        await self.manager_view.refresh_entries()
+        if target_user_id == self.manager_view.member.id:
+            await self.manager_view.entry_added(
+                (entry_id, point_value, self.reason.value, interaction.user.id)
+            )
         await interaction.response.edit_message(
             embed=self.manager_view.get_page_embed(), view=self.manager_view
         )
+
+
+# ----- Modal for Bulk Moderation -----
+class BulkDeleteModal(discord.ui.Modal, title="Bulk Delete Reputation"):
+    entry_ids: discord.ui.TextInput
+    author_user_id: discord.ui.TextInput
+    other_user_id: discord.ui.TextInput
+
+    def __init__(self, manager_view):
+        super().__init__()
+        self.manager_view = manager_view
+
+        self.entry_ids = discord.ui.TextInput(
+            label="Entry IDs",
+            placeholder="e.g. 12, 15, 20-30",
+            required=False,
+        )
+        self.author_user_id = discord.ui.TextInput(
+            label="Delete every entry written by user ID",
+            placeholder="Author user ID",
+            required=False,
+        )
+        self.other_user_id = discord.ui.TextInput(
+            label=f"Void entries between {manager_view.member.display_name[:20]} and",
+            placeholder="Other user ID",
+            required=False,
+        )
+
+        self.add_item(self.entry_ids)
+        self.add_item(self.author_user_id)
+        self.add_item(self.other_user_id)
+
+    @staticmethod
+    def parse_entry_ids(text: str):
+        # "12, 15, 20-30" -> ([12, 15], [(20, 30)])
+        ids, ranges = [], []
+        for part in text.replace(",", " ").split():
+            if "-" in part:
+                first, last = part.split("-", 1)
+                ranges.append((int(first), int(last)))
+            else:
+                ids.append(int(part))
+        return ids, ranges
+
+    async def on_submit(self, interaction: discord.Interaction):
+        try:
+            ids, ranges = self.parse_entry_ids(self.entry_ids.value)
+            author_user_id = int(self.author_user_id.value or 0)
+            other_user_id = int(self.other_user_id.value or 0)
+        except ValueError:
+            await interaction.response.send_message(
+                "IDs must be numbers (ranges look like `20-30`).", ephemeral=True
+            )
+            return
+
+        # Each operation is its own transaction
+        guild_id = self.manager_view.guild_id
+        results = []
+        skipped = 0
+        if ids:
+            deleted, archived = await AsyncDB.delete_entries(guild_id, ids)
+            results.append(f"{deleted} entries by ID")
+            skipped += archived
+        for first_id, last_id in ranges:
+            deleted, archived = await AsyncDB.delete_entry_range(
+                guild_id, first_id, last_id
+            )
+            results.append(f"{deleted} entries in {first_id}-{last_id}")
+            skipped += archived
+        if author_user_id:
+            deleted, archived = await AsyncDB.delete_entries_by_author(
+                guild_id, author_user_id
+            )
+            results.append(f"{deleted} entries by <@{author_user_id}>")
+            skipped += archived
+        if other_user_id:
+            deleted, archived = await AsyncDB.void_entries_between(
+                guild_id, self.manager_view.member.id, other_user_id
+            )
+            results.append(f"{deleted} entries with <@{other_user_id}>")
+            skipped += archived
+
+        content = ("Deleted " + ", ".join(results)) if results else "Nothing to delete."
+        if skipped:
+            # Archived entries sit in compressed chunks and still count in totals
+            content += f"\nSkipped {skipped} archived entries, archived entries can't be deleted."
+
+        await self.manager_view.reload()
+        await interaction.response.edit_message(
+            content=content,
+            embed=self.manager_view.get_page_embed(),
+            view=self.manager_view,
+        )
@@ -16,12 +16,16 @@ RULES = [
 ]
 
 
-def make_rule_embed(rule_number: int) -> discord.Embed:
-    message: str = "Invalid Rule Number!"
+def build_rule_embed(message: str) -> discord.Embed:
+    return discord.Embed(color=discord.Colour.red(), description=message)
+
 
-    if rule_number >= 1 and rule_number <= len(RULES) + 1:
-        message = RULES[rule_number - 1]
+# Built once, every !rule call reuses them
+RULE_EMBEDS = [build_rule_embed(rule) for rule in RULES]
+INVALID_RULE_EMBED = build_rule_embed("Invalid Rule Number!")
 
-    embed = discord.Embed(color=discord.Colour.red(), description=message)
 
-    return embed
+def make_rule_embed(rule_number: int) -> discord.Embed:
+    if 1 <= rule_number <= len(RULES):
+        return RULE_EMBEDS[rule_number - 1]
+    return INVALID_RULE_EMBED
@@ -0,0 +1,73 @@
+import discord
+from db import AsyncDB
+
+
+class SearchPaginator(discord.ui.View):
+    def __init__(self, guild_id, query, target, author, per_page=10):
+        super().__init__(timeout=120)
+        self.guild_id = guild_id
+        self.query = query
+        self.target = target
+        self.author = author
+        self.per_page = per_page
+        self.current_page = 0
+        self.page_entries = []
+        self.has_next = False
+
+    async def load_page(self, page: int):
+        # One extra row tells us whether there is a next page without counting
+        rows = await AsyncDB.search_reviews(
+            self.guild_id,
+            self.query,
+            self.target.id if self.target else None,
+            self.author.id if self.author else None,
+            self.per_page + 1,
+            page * self.per_page,
+        )
+        self.has_next = len(rows) > self.per_page
+        self.page_entries = rows[: self.per_page]
+        self.current_page = page
+
+        self.prev_button.disabled = page <= 0
+        self.next_button.disabled = not self.has_next
+
+    def get_page_embed(self):
+        filters = []
+        if self.target:
+            filters.append(f"For: {self.target.mention}")
+        if self.author:
+            filters.append(f"By: {self.author.mention}")
+
+        description_lines = [" | ".join(filters) + "\n"] if filters else []
+        for entry_id, target_id, author_id, points, snippet in self.page_entries:
+            description_lines.append(
+                f"`#{entry_id}` {points:+d} | <@{author_id}> → <@{target_id}> | {snippet}"
+            )
+
+        page_embed = discord.Embed(
+            title=f"Reviews matching: {self.query}",
+            description="\n".join(description_lines),
+            color=discord.Color.blurple(),
+        )
+        page_embed.set_footer(text=f"Page {self.current_page + 1}")
+        return page_embed
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def prev_button(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ):
+        if self.current_page > 0:
+            await self.load_page(self.current_page - 1)
+            await interaction.response.edit_message(
+                embed=self.get_page_embed(), view=self
+            )
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next_button(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ):
+        if self.has_next:
+            await self.load_page(self.current_page + 1)
+            await interaction.response.edit_message(
+                embed=self.get_page_embed(), view=self
+            )
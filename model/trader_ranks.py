@@ -0,0 +1,48 @@
+TRADER_RANKS = [
+    {"name": "Potential Trader", "required": 5, "role_id": 1484354856352219327},
+    {"name": "Trusted Trader", "required": 15, "role_id": 1058092559773216858},
+    {"name": "Trade Leader", "required": 30, "role_id": 1484356325960978442},
+    {"name": "Elite Trader", "required": 45, "role_id": 1058867257868030012},
+    {"name": "Champion Trader", "required": 100, "role_id": 1484356944822140960},
+]
+
+# All tracked trader roles
+ALL_RANK_ROLE_IDS = {rank["role_id"] for rank in TRADER_RANKS}
+
+
+def get_eligible_role_ids(unique_users: int) -> set[int]:
+    # Roles user SHOULD have
+    return {
+        rank["role_id"] for rank in TRADER_RANKS if unique_users >= rank["required"]
+    }
+
+
+def get_rank_role_changes(member, guild, unique_users: int):
+    # (roles to add, roles to remove) that bring the member's trader ranks in
+    # line with unique_users, both empty when they already match. Only rank
+    # roles are ever listed, so roles outside them are never touched.
+    eligible_roles = get_eligible_role_ids(unique_users)
+    user_role_ids = {role.id for role in member.roles}
+
+    roles_to_add = [
+        role
+        for role in (guild.get_role(role_id) for role_id in eligible_roles - user_role_ids)
+        if role is not None
+    ]
+    roles_to_remove = [
+        role
+        for role in member.roles
+        if role.id in ALL_RANK_ROLE_IDS and role.id not in eligible_roles
+    ]
+    return roles_to_add, roles_to_remove
+
+
+async def sync_rank_roles(member, guild, unique_users: int) -> int:
+    # Sends the rank role changes as add_roles/remove_roles, one request per
+    # role, and returns how many requests it took
+    roles_to_add, roles_to_remove = get_rank_role_changes(member, guild, unique_users)
+    if roles_to_add:
+        await member.add_roles(*roles_to_add, reason="Trader rank sync")
+    if roles_to_remove:
+        await member.remove_roles(*roles_to_remove, reason="Trader rank sync")
+    return len(roles_to_add) + len(roles_to_remove)
@@ -0,0 +1,223 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+
+class RankIndex:
+    # Order statistics over per-user scores, kept in memory.
+    # Users are bucketed by score and a Fenwick tree counts users per score,
+    # so updates, rank lookups and rank-range lookups are all O(log n).
+    # Leaderboard order is score descending, then user id ascending.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.load([])
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def load(self, totals):
+        # totals is an iterable of (user_id, score)
+        with self.lock:
+            self.scores = {}
+            self.buckets = {}
+            for user_id, score in totals:
+                self.scores[user_id] = score
+                self.buckets.setdefault(score, []).append(user_id)
+
+            for bucket in self.buckets.values():
+                bucket.sort()
+
+            self._resize()
+
+    def _resize(self, extra_score: int | None = None):
+        # Rebuilds the tree so every known score (plus some headroom) fits
+        known = list(self.buckets)
+        if extra_score is not None:
+            known.append(extra_score)
+
+        low = min(known, default=0)
+        high = max(known, default=0)
+        padding = max((high - low) // 2, 64)
+
+        self.offset = low - padding  # score stored at tree position 1
+        self.size = high - low + 2 * padding + 1
+        self.tree = [0] * (self.size + 1)
+
+        # Linear time Fenwick construction
+        for score, bucket in self.buckets.items():
+            self.tree[score - self.offset + 1] += len(bucket)
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+
+    def _add(self, score: int, delta: int):
+        i = score - self.offset + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def _count_at_or_below(self, score: int) -> int:
+        i = min(score - self.offset + 1, self.size)
+        count = 0
+        while i > 0:
+            count += self.tree[i]
+            i -= i & -i
+        return count
+
+    def _score_at(self, ascending_position: int) -> int:
+        # Smallest score whose cumulative count reaches ascending_position (1-based)
+        position = 0
+        remaining = ascending_position
+        step = 1 << (self.size.bit_length() - 1)
+        while step:
+            candidate = position + step
+            if candidate <= self.size and self.tree[candidate] < remaining:
+                position = candidate
+                remaining -= self.tree[candidate]
+            step >>= 1
+        return position + self.offset
+
+    def update(self, user_id: int, score: int | None):
+        # Pass None when the user no longer has any reputation
+        with self.lock:
+            old_score = self.scores.get(user_id)
+            if old_score == score:
+                return
+
+            if old_score is not None:
+                bucket = self.buckets[old_score]
+                del bucket[bisect_left(bucket, user_id)]
+                if not bucket:
+                    del self.buckets[old_score]
+                self._add(old_score, -1)
+                del self.scores[user_id]
+
+            if score is None:
+                return
+
+            self.scores[user_id] = score
+            insort(self.buckets.setdefault(score, []), user_id)
+            if self.offset <= score < self.offset + self.size:
+                self._add(score, 1)
+            else:
+                self._resize()  # Out of range, rare enough to rebuild
+
+    def score(self, user_id: int) -> int | None:
+        with self.lock:
+            return self.scores.get(user_id)
+
+    def rank(self, user_id: int) -> int:
+        # 1 + number of users with a strictly higher score, 0 if unknown
+        with self.lock:
+            score = self.scores.get(user_id)
+            if score is None:
+                return 0
+            return len(self.scores) - self._count_at_or_below(score) + 1
+
+    def page(self, start: int, count: int) -> list[tuple[int, int]]:
+        # (user_id, score) for leaderboard positions start .. start + count - 1 (0-based)
+        with self.lock:
+            return self._page(start, count)
+
+    def page_after(
+        self, cursor: tuple[int, int] | None, count: int
+    ) -> tuple[int, list[tuple[int, int]]]:
+        # Keyset pagination: cursor is the (score, user_id) of the last entry
+        # already shown, or None for the first page. Returns the 0-based
+        # position of the first entry and the entries themselves. Entries
+        # moving around between calls can't shift the next page's window.
+        with self.lock:
+            if cursor is None:
+                return 0, self._page(0, count)
+
+            score, user_id = cursor
+            above = len(self.scores) - self._count_at_or_below(score)
+            start = above + bisect_right(self.buckets.get(score, []), user_id)
+            return start, self._page(start, count)
+
+    def _page(self, start: int, count: int) -> list[tuple[int, int]]:
+        entries = []
+        position = max(start, 0)
+        total = len(self.scores)
+
+        while len(entries) < count and position < total:
+            score = self._score_at(total - position)
+            bucket = self.buckets[score]
+            above = total - self._count_at_or_below(score)
+            offset = position - above
+            taken = bucket[offset : offset + count - len(entries)]
+            entries.extend((user_id, score) for user_id in taken)
+            position += len(taken)
+
+        return entries
+
+
+class SortedRankIndex:
+    # RankIndex for float scores, which can't be bucketed into a Fenwick tree.
+    # Keeps one sorted list of (-score, user_id) keys: lookups bisect, updates
+    # shift the list, which is a memmove even for a few hundred thousand users.
+    # Same order and interface as RankIndex.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.load([])
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def load(self, totals):
+        # totals is an iterable of (user_id, score)
+        with self.lock:
+            self.scores = dict(totals)
+            self.keys = sorted((-score, user_id) for user_id, score in self.scores.items())
+
+    def update(self, user_id: int, score: float | None):
+        # Pass None when the user no longer has any reputation
+        with self.lock:
+            old_score = self.scores.get(user_id)
+            if old_score == score:
+                return
+
+            if old_score is not None:
+                del self.keys[bisect_left(self.keys, (-old_score, user_id))]
+                del self.scores[user_id]
+
+            if score is None:
+                return
+
+            self.scores[user_id] = score
+            insort(self.keys, (-score, user_id))
+
+    def score(self, user_id: int) -> float | None:
+        with self.lock:
+            return self.scores.get(user_id)
+
+    def rank(self, user_id: int) -> int:
+        # 1 + number of users with a strictly higher score, 0 if unknown
+        with self.lock:
+            score = self.scores.get(user_id)
+            if score is None:
+                return 0
+            return bisect_left(self.keys, (-score,)) + 1
+
+    def page(self, start: int, count: int) -> list[tuple[int, float]]:
+        # (user_id, score) for leaderboard positions start .. start + count - 1 (0-based)
+        start = max(start, 0)
+        with self.lock:
+            return [
+                (user_id, -score) for score, user_id in self.keys[start : start + count]
+            ]
+
+    def page_after(
+        self, cursor: tuple[float, int] | None, count: int
+    ) -> tuple[int, list[tuple[int, float]]]:
+        # Same as RankIndex.page_after
+        with self.lock:
+            start = 0
+            if cursor is not None:
+                score, user_id = cursor
+                start = bisect_right(self.keys, (-score, user_id))
+            return start, [
+                (user_id, -score) for score, user_id in self.keys[start : start + count]
+            ]
@@ -0,0 +1,273 @@
+import threading
+from array import array
+
+MAX_CLIQUES = 25  # Per cluster, Bron-Kerbosch can blow up on big dense groups
+MAX_RING_SIZE = 50  # Bigger components are the regular trading community
+
+
+class RingCluster:
+    # One strongly connected group of users who all (indirectly) rep each other
+
+    def __init__(self, user_ids, internal_edges, mutual_pairs, insularity, cliques):
+        size = len(user_ids)
+        self.user_ids = user_ids
+        self.internal_edges = internal_edges
+        self.mutual_pairs = mutual_pairs
+        self.density = internal_edges / (size * (size - 1))
+        self.reciprocity = 2 * mutual_pairs / internal_edges if internal_edges else 0.0
+        # Share of the members' positive authors that are other members
+        self.insularity = insularity
+        self.cliques = cliques
+        self.score = insularity * (self.density + self.reciprocity) / 2
+
+
+class RingReport:
+    def __init__(self, version, min_size, node_count, edge_count, clusters, pairs):
+        self.version = version
+        self.min_size = min_size
+        self.node_count = node_count
+        self.edge_count = edge_count
+        self.clusters = clusters  # RingCluster, most suspicious first
+        self.pairs = pairs  # (score, first_user_id, second_user_id), most suspicious first
+
+
+class RingDetector:
+    # Positive-rep graph (author -> target, one edge per distinct pair) kept in
+    # memory for spotting rep rings. User ids are mapped to dense node numbers,
+    # edges are per-node sets so reps can be added and removed as they happen,
+    # and analysis runs over a flat CSR copy taken under the lock.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = False  # Nothing is tracked until the first load()
+        self._clear()
+
+    def _clear(self):
+        self.node_of = {}
+        self.user_ids = []
+        self.out_edges = []
+        self.in_degree = array("l")
+        self.mutual_pairs = set()  # (lower node, higher node)
+        self.edge_count = 0
+        self.version = 0
+        self.report = None
+
+    def load(self, pairs):
+        # pairs is an iterable of (author_user_id, target_user_id)
+        with self.lock:
+            self._clear()
+            node = self._node
+            out_edges = self.out_edges
+            for author_user_id, target_user_id in pairs:
+                if author_user_id != target_user_id:
+                    out_edges[node(author_user_id)].add(node(target_user_id))
+
+            # Degrees and mutual pairs in one pass once every edge is known
+            in_degree = self.in_degree
+            for author, targets in enumerate(out_edges):
+                self.edge_count += len(targets)
+                for target in targets:
+                    in_degree[target] += 1
+                    if author < target and author in out_edges[target]:
+                        self.mutual_pairs.add((author, target))
+            self.loaded = True
+
+    def _node(self, user_id: int) -> int:
+        node = self.node_of.get(user_id)
+        if node is None:
+            node = len(self.user_ids)
+            self.node_of[user_id] = node
+            self.user_ids.append(user_id)
+            self.out_edges.append(set())
+            self.in_degree.append(0)
+        return node
+
+    def _set_edge(self, author_user_id: int, target_user_id: int, present: bool):
+        if author_user_id == target_user_id:
+            return
+
+        author = self._node(author_user_id)
+        target = self._node(target_user_id)
+        targets = self.out_edges[author]
+        if (target in targets) == present:
+            return
+
+        pair = (min(author, target), max(author, target))
+        if present:
+            targets.add(target)
+            self.in_degree[target] += 1
+            self.edge_count += 1
+            if author in self.out_edges[target]:
+                self.mutual_pairs.add(pair)
+        else:
+            targets.discard(target)
+            self.in_degree[target] -= 1
+            self.edge_count -= 1
+            self.mutual_pairs.discard(pair)
+        self.version += 1
+
+    def set_edge(self, author_user_id: int, target_user_id: int, present: bool):
+        with self.lock:
+            self._set_edge(author_user_id, target_user_id, present)
+
+    def analyse(self, min_size: int = 3) -> RingReport:
+        # Reuses the last report while the graph hasn't changed
+        with self.lock:
+            report = self.report
+            if (
+                report is not None
+                and report.version == self.version
+                and report.min_size == min_size
+            ):
+                return report
+
+            version = self.version
+            user_ids = list(self.user_ids)
+            in_degree = array("l", self.in_degree)
+            mutual_pairs = list(self.mutual_pairs)
+            offsets = array("l", [0])
+            edges = array("l")
+            for targets in self.out_edges:
+                edges.extend(targets)
+                offsets.append(len(edges))
+
+        components = strongly_connected_components(offsets, edges, min_size)
+        clusters = [
+            _score_cluster(members, offsets, edges, in_degree, user_ids)
+            for members in components
+            if len(members) <= MAX_RING_SIZE
+        ]
+        clusters.sort(key=lambda cluster: cluster.score, reverse=True)
+
+        pairs = [
+            # Near 1 when the pair mostly rep each other and few others rep them
+            (min(1 / in_degree[first], 1 / in_degree[second]), user_ids[first], user_ids[second])
+            for first, second in mutual_pairs
+        ]
+        pairs.sort(reverse=True)
+
+        report = RingReport(
+            version, min_size, len(user_ids), len(edges), clusters, pairs
+        )
+        with self.lock:
+            if self.version == version:
+                self.report = report
+        return report
+
+
+def strongly_connected_components(offsets, edges, min_size: int):
+    # Iterative Tarjan over a CSR graph, returns components of at least
+    # min_size nodes as lists of node numbers
+    node_count = len(offsets) - 1
+    index_of = array("l", [-1]) * node_count
+    low_link = array("l", [0]) * node_count
+    on_stack = bytearray(node_count)
+    stack = []
+    components = []
+    next_index = 0
+
+    for root in range(node_count):
+        if index_of[root] != -1:
+            continue
+
+        # Each frame is (node, position of the next edge to visit)
+        work = [(root, offsets[root])]
+        index_of[root] = low_link[root] = next_index
+        next_index += 1
+        stack.append(root)
+        on_stack[root] = 1
+
+        while work:
+            node, position = work[-1]
+            end = offsets[node + 1]
+            while position < end:
+                child = edges[position]
+                position += 1
+                if index_of[child] == -1:
+                    work[-1] = (node, position)
+                    index_of[child] = low_link[child] = next_index
+                    next_index += 1
+                    stack.append(child)
+                    on_stack[child] = 1
+                    work.append((child, offsets[child]))
+                    break
+                if on_stack[child] and index_of[child] < low_link[node]:
+                    low_link[node] = index_of[child]
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if low_link[node] < low_link[parent]:
+                        low_link[parent] = low_link[node]
+
+                if low_link[node] == index_of[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) >= min_size:
+                        components.append(component)
+
+    return components
+
+
+def _score_cluster(members, offsets, edges, in_degree, user_ids) -> RingCluster:
+    member_set = set(members)
+    neighbours = {member: set() for member in members}
+    internal_edges = 0
+    for member in members:
+        for position in range(offsets[member], offsets[member + 1]):
+            target = edges[position]
+            if target in member_set:
+                internal_edges += 1
+                neighbours[member].add(target)
+
+    # Mutual (undirected) edges inside the cluster
+    mutual = {
+        member: {other for other in targets if member in neighbours[other]}
+        for member, targets in neighbours.items()
+    }
+    mutual_pairs = sum(len(others) for others in mutual.values()) // 2
+    total_in = sum(in_degree[member] for member in members)
+
+    cliques = [
+        sorted(user_ids[member] for member in clique)
+        for clique in maximal_cliques(mutual, 3)
+    ]
+    cliques.sort(key=len, reverse=True)
+
+    return RingCluster(
+        sorted(user_ids[member] for member in members),
+        internal_edges,
+        mutual_pairs,
+        internal_edges / total_in if total_in else 0.0,
+        cliques,
+    )
+
+
+def maximal_cliques(adjacency, min_size: int):
+    # Bron-Kerbosch with pivoting on an undirected adjacency dict, stops
+    # after MAX_CLIQUES results. Iterative so large groups can't hit the
+    # recursion limit.
+    cliques = []
+    work = [([], set(adjacency), set())]
+    while work and len(cliques) < MAX_CLIQUES:
+        clique, candidates, excluded = work.pop()
+        if not candidates:
+            if not excluded and len(clique) >= min_size:
+                cliques.append(clique)
+            continue
+        if len(clique) + len(candidates) < min_size:
+            continue
+
+        pivot = max(candidates | excluded, key=lambda node: len(adjacency[node] & candidates))
+        for node in list(candidates - adjacency[pivot]):
+            work.append(
+                (clique + [node], candidates & adjacency[node], excluded & adjacency[node])
+            )
+            candidates.remove(node)
+            excluded.add(node)
+    return cliques
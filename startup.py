@@ -0,0 +1,92 @@
+import importlib.abc
+import importlib.machinery
+import sys
+import time
+from contextlib import contextmanager
+
+
+class StartupProfile:
+    # Timings from process start until the bot is ready, printed once as a
+    # table of (start offset, duration, name). Phases may overlap, e.g. the
+    # database warm-up runs alongside the gateway login.
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings = []  # (name, started, seconds)
+        self.imports = {}  # module name -> seconds spent executing it
+        self.marks = {}  # name -> perf_counter time, for phases spanning callbacks
+        self.reported = False
+
+    def add(self, name: str, started: float, seconds: float):
+        self.timings.append((name, started, seconds))
+
+    def mark(self, name: str):
+        self.marks[name] = time.perf_counter()
+
+    def add_since(self, name: str, mark: str):
+        started = self.marks[mark]
+        self.add(name, started, time.perf_counter() - started)
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, started, time.perf_counter() - started)
+
+    def report(self) -> str:
+        self.reported = True
+        lines = [f"Startup took {time.perf_counter() - self.started:.2f}s:"]
+        for name, started, seconds in sorted(self.timings, key=lambda timing: timing[1]):
+            lines.append(
+                f"  at {(started - self.started) * 1000:7.1f}ms "
+                f"took {seconds * 1000:7.1f}ms  {name}"
+            )
+        return "\n".join(lines)
+
+
+profile = StartupProfile()
+
+
+class TimedLoader(importlib.abc.Loader):
+    # Wraps a module's real loader to record how long the module body takes,
+    # including everything it imports that wasn't loaded yet
+
+    def __init__(self, loader, name: str):
+        self.loader = loader
+        self.name = name
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        started = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            profile.imports[self.name] = time.perf_counter() - started
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)  # get_source etc. for tracebacks
+
+
+class TimedImportFinder(importlib.abc.MetaPathFinder):
+    # Hands out TimedLoader for every module in one package, so extension
+    # imports are timed without changing how discord.py loads them
+
+    def __init__(self, package: str):
+        self.prefix = package + "."
+
+    def find_spec(self, fullname, path, target=None):
+        if not fullname.startswith(self.prefix):
+            return None
+
+        spec = importlib.machinery.PathFinder.find_spec(fullname, path, target)
+        if spec is not None and spec.loader is not None:
+            spec.loader = TimedLoader(spec.loader, fullname)
+        return spec
+
+
+def time_imports(package: str):
+    sys.meta_path.insert(0, TimedImportFinder(package))
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+# The bot's modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import ConnectionPool  # noqa: E402
+from migrations import migrate  # noqa: E402
+
+
+@pytest.fixture
+def pool(tmp_path):
+    # A fresh, fully migrated and analysed database file
+    pool = ConnectionPool(str(tmp_path / "points.db"), readers=1)
+    with pool.write() as connection:
+        migrate(connection)
+        connection.execute("ANALYZE")
+    yield pool
+    pool.close()
@@ -0,0 +1,55 @@
+import db
+
+
+def test_production_queries_use_an_index(pool):
+    with pool.read() as connection:
+        assert db.DB.find_query_plan_scans(connection) == []
+
+
+def test_every_trigger_statement_is_checked(pool):
+    with pool.read() as connection:
+        triggers = {
+            name for (name,) in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+            )
+        }
+        statements = db.trigger_statements(connection)
+
+    checked = {name.split()[1] for name, _, _ in statements}
+    assert triggers and checked == triggers
+
+
+def test_write_statements_are_checked():
+    sql = [sql for sql, _ in db.PRODUCTION_QUERIES.values()]
+    for statement in (
+        db.INSERT_ENTRY_SQL,
+        db.GET_SETTING_SQL,
+        db.SET_SETTING_SQL,
+        db.cooldowns.INSERT_SQL,
+        db.archive.INSERT_CHUNK_SQL,
+        db.transfer.IMPORT_SQL,
+    ):
+        assert statement in sql
+
+
+def test_reports_a_scan_in_a_query(pool, monkeypatch):
+    monkeypatch.setitem(
+        db.PRODUCTION_QUERIES,
+        "by_reason",
+        ("SELECT id FROM reputation WHERE reason = ?", ("",)),
+    )
+    with pool.read() as connection:
+        assert db.DB.find_query_plan_scans(connection) == [
+            ("by_reason", "SCAN reputation")
+        ]
+
+
+def test_reports_a_scan_in_a_trigger(pool):
+    with pool.write() as connection:
+        connection.execute(
+            "CREATE TRIGGER by_reason AFTER INSERT ON reputation BEGIN "
+            "UPDATE reputation SET point_value = 0 WHERE reason = NEW.reason; END"
+        )
+        assert db.DB.find_query_plan_scans(connection) == [
+            ("trigger by_reason #1", "SCAN reputation")
+        ]
@@ -0,0 +1,39 @@
+# Fails if any production query regresses to a full table scan.
+# Usage: python tools/check_query_plans.py [database]  (defaults to a fresh temp database)
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import DB, ConnectionPool
+from migrations import migrate
+
+
+def main() -> int:
+    if len(sys.argv) > 1:
+        database_name = sys.argv[1]
+    else:
+        database_name = os.path.join(tempfile.mkdtemp(), "points.db")
+
+    pool = ConnectionPool(database_name, readers=1)
+    with pool.write() as connection:
+        migrate(connection)
+        connection.execute("ANALYZE")
+
+    with pool.read() as connection:
+        scans = DB.find_query_plan_scans(connection)
+    pool.close()
+
+    for name, detail in scans:
+        print(f"FAIL {name}: {detail}")
+
+    if scans:
+        return 1
+
+    print("All production queries use an index")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+# Offline load test for the Points cog. Builds a synthetic database, then
+# fires concurrent slash command invocations through the real cog methods with
+# fake interactions, no Discord connection needed.
+#
+# Usage: python tools/loadtest.py --users 5000 --rows 200000 --requests 5000
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from cogs.points import Points
+from db import AsyncDB, ExperienceType
+from migrations import MIGRATIONS, migrate
+from model.trader_ranks import TRADER_RANKS
+
+COMMANDS = ["reputation", "check_reputation", "repboard", "reprank", "traderank"]
+
+
+class FakeRole:
+    def __init__(self, role_id: int):
+        self.id = role_id
+
+    def is_default(self) -> bool:
+        return False
+
+
+class FakeGuild:
+    def __init__(self):
+        self.id = db.HOME_GUILD_ID
+        self.roles = {rank["role_id"]: FakeRole(rank["role_id"]) for rank in TRADER_RANKS}
+
+    def get_role(self, role_id: int):
+        return self.roles.get(role_id)
+
+
+class FakeMember:
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.mention = f"<@{user_id}>"
+        self.display_name = f"user{user_id}"
+        self.roles = []
+
+    async def add_roles(self, *roles, reason=None):
+        self.roles.extend(roles)
+
+    async def remove_roles(self, *roles, reason=None):
+        self.roles = [role for role in self.roles if role not in roles]
+
+    async def edit(self, roles=None, reason=None):
+        if roles is not None:
+            self.roles = list(roles)
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def defer(self, **kwargs):
+        self.interaction.deferred_at = time.perf_counter()
+
+    async def send_message(self, *args, **kwargs):
+        self.interaction.done_at = time.perf_counter()
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, *args, **kwargs):
+        self.interaction.done_at = time.perf_counter()
+
+
+class FakeInteraction:
+    def __init__(self, user: FakeMember, guild: FakeGuild):
+        self.user = user
+        self.guild = guild
+        self.guild_id = guild.id
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        self.deferred_at = None
+        self.done_at = None
+
+
+def build_database(path: str, users: int, rows: int, seed: int):
+    # Bulk load raw rows first, then let the migrations build totals and indexes
+    random.seed(seed)
+    connection = sqlite3.connect(path)
+    connection.executescript(f"BEGIN;\n{MIGRATIONS[0]}\nPRAGMA user_version = 1;\nCOMMIT;")
+
+    chunk = 50_000
+    for start in range(0, rows, chunk):
+        connection.executemany(
+            "INSERT INTO reputation (target_user_id, author_user_id, point_value, reason) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                (
+                    random.randint(1, users),
+                    random.randint(1, users),
+                    1 if random.random() < 0.9 else -1,
+                    "Synthetic review for load testing",
+                )
+                for _ in range(min(chunk, rows - start))
+            ),
+        )
+        connection.commit()
+
+    migrate(connection)
+    connection.close()
+
+
+async def measure_loop_lag(samples: list[float], stop: asyncio.Event, interval=0.01):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        before = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(loop.time() - before - interval, 0.0))
+
+
+async def invoke(cog: Points, command: str, guild: FakeGuild, users: int):
+    author = FakeMember(random.randint(1, users))
+    target = FakeMember(random.randint(1, users))
+    interaction = FakeInteraction(author, guild)
+    callback = getattr(cog, command).callback
+
+    started = time.perf_counter()
+    if command == "reputation":
+        experience = random.choice([ExperienceType.positive, ExperienceType.negative])
+        await callback(cog, interaction, target, experience, "Load test review")
+    elif command in ("check_reputation", "traderank"):
+        await callback(cog, interaction, target)
+    else:
+        await callback(cog, interaction)
+
+    finished = interaction.done_at or time.perf_counter()
+    to_defer = (interaction.deferred_at or finished) - started
+    return command, finished - started, to_defer
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def report(name: str, values: list[float]):
+    if not values:
+        return
+    print(
+        f"{name:<18} n={len(values):<7} "
+        f"p50={percentile(values, 0.50) * 1000:8.2f}ms "
+        f"p95={percentile(values, 0.95) * 1000:8.2f}ms "
+        f"p99={percentile(values, 0.99) * 1000:8.2f}ms "
+        f"max={max(values) * 1000:8.2f}ms"
+    )
+
+
+async def run(args):
+    db.partitions.attach(db.HOME_GUILD_ID, args.database)
+    await AsyncDB.open()
+
+    cog = Points(None)
+    guild = FakeGuild()
+    weights = [args.write_ratio] + [(1 - args.write_ratio) / 4] * 4
+    semaphore = asyncio.Semaphore(args.concurrency)
+    results = []
+
+    async def limited():
+        async with semaphore:
+            command = random.choices(COMMANDS, weights)[0]
+            results.append(await invoke(cog, command, guild, args.users))
+
+    lag = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(lag, stop))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(limited() for _ in range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await lag_task
+    await AsyncDB.close()
+
+    print(f"\n{len(results)} invocations in {elapsed:.2f}s ({len(results) / elapsed:.0f}/s)")
+    for command in COMMANDS:
+        report(command, [latency for name, latency, _ in results if name == command])
+    report("time to defer", [to_defer for _, _, to_defer in results])
+    report("event loop lag", lag)
+    if lag:
+        print(f"mean event loop lag: {statistics.mean(lag) * 1000:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the Points cog")
+    parser.add_argument("--database", help="Existing database to use (skips generation)")
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.database is None:
+        args.database = os.path.join(tempfile.mkdtemp(), "points.db")
+        started = time.perf_counter()
+        build_database(args.database, args.users, args.rows, args.seed)
+        print(
+            f"Generated {args.rows} rows for {args.users} users "
+            f"in {time.perf_counter() - started:.1f}s at {args.database}"
+        )
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
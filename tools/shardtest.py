@@ -0,0 +1,138 @@
+# Offline test for running sharded: one data service plus several bot
+# processes, each driving the Points cog for the guilds of its shards with fake
+# interactions (no gateway connection), all through the data service socket.
+# Checks that every write landed in the right guild's partition.
+#
+# Usage: python tools/shardtest.py --processes 4 --guilds 16 --requests 2000
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from data_service import DataService, DataServiceClient
+from db import AsyncDB
+from loadtest import COMMANDS, FakeGuild, invoke, report
+
+
+def shard_for(guild_id: int, shard_count: int) -> int:
+    # Same formula Discord uses to place a guild on a shard
+    return (guild_id >> 22) % shard_count
+
+
+def run_process(socket_path, guild_ids, requests, users, seed, results):
+    # One bot process: its own client connection, the real cog, fake guilds
+    from cogs.points import Points
+
+    async def run():
+        AsyncDB.remote = DataServiceClient(socket_path)
+        await AsyncDB.open()
+
+        random.seed(seed)
+        cog = Points(None)
+        guilds = []
+        for guild_id in guild_ids:
+            guild = FakeGuild()
+            guild.id = guild_id
+            guilds.append(guild)
+
+        writes = dict.fromkeys(guild_ids, 0)
+
+        async def one():
+            guild = random.choice(guilds)
+            command = random.choice(COMMANDS)
+            if command == "reputation":
+                writes[guild.id] += 1
+            return await invoke(cog, command, guild, users)
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+        await AsyncDB.close()
+        results.put((writes, latencies, elapsed))
+
+    asyncio.run(run())
+
+
+async def run(args):
+    os.chdir(tempfile.mkdtemp())  # Every guild's file lands here
+    socket_path = os.path.abspath("points-data.sock")
+    service = DataService(socket_path)
+    await service.start()
+
+    guild_ids = [(index + 1) << 22 | random.getrandbits(22) for index in range(args.guilds)]
+    by_process = [[] for _ in range(args.processes)]
+    for guild_id in guild_ids:
+        by_process[shard_for(guild_id, args.processes)].append(guild_id)
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=run_process,
+            args=(socket_path, own, args.requests, args.users, args.seed + index, results),
+        )
+        for index, own in enumerate(by_process)
+        if own
+    ]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+
+    loop = asyncio.get_running_loop()
+    outcomes = [await loop.run_in_executor(None, results.get) for _ in processes]
+    for process in processes:
+        await loop.run_in_executor(None, process.join)
+    elapsed = time.perf_counter() - started
+    await service.close()
+
+    writes = {}
+    latencies = []
+    for process_writes, process_latencies, _ in outcomes:
+        writes.update(process_writes)
+        latencies += process_latencies
+
+    print(
+        f"\n{len(processes)} processes, {len(latencies)} invocations in {elapsed:.2f}s "
+        f"({len(latencies) / elapsed:.0f}/s including process start)"
+    )
+    for command in COMMANDS:
+        report(command, [latency for name, latency, _ in latencies if name == command])
+
+    failures = 0
+    for guild_id, expected in sorted(writes.items()):
+        connection = sqlite3.connect(db.partitions.database_name(guild_id))
+        stored = connection.execute("SELECT COUNT(*) FROM reputation").fetchone()[0]
+        connection.close()
+        if stored != expected:
+            failures += 1
+            print(f"FAIL guild {guild_id}: {stored} entries stored, {expected} written")
+
+    if failures:
+        return 1
+    print(f"All {len(writes)} guild partitions hold exactly their own writes")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline test for sharded bot processes")
+    parser.add_argument("--processes", type=int, default=4, help="Bot processes, one shard each")
+    parser.add_argument("--guilds", type=int, default=16)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=2_000, help="Per process")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Export, import and snapshot the reputation database, safe to run while the
+# bot is up (WAL lets this process read and write alongside it). Imported rows
+# only show up in the running bot's leaderboard after a restart or /rebuild_totals.
+#
+# Usage:
+#   python tools/transfer.py export reputation.ndjson   (or .csv)
+#   python tools/transfer.py import reputation.csv
+#   python tools/transfer.py backup points-backup.db
+#   python tools/transfer.py archive --days 365
+#   python tools/transfer.py export other.ndjson --guild 1234  (another server's file)
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+from db import DB
+from transfer import FORMATS
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Move reputation data in and out")
+    parser.add_argument("action", choices=["export", "import", "backup", "archive"])
+    parser.add_argument(
+        "path", nargs="?", help="File to write (export, backup) or read (import)"
+    )
+    parser.add_argument(
+        "--guild", type=int, default=db.HOME_GUILD_ID, help="Server whose data to use"
+    )
+    parser.add_argument(
+        "--database", help="Defaults to the guild's own file, points.db for the home server"
+    )
+    parser.add_argument(
+        "--days",
+        type=float,
+        default=db.ARCHIVE_AFTER_DAYS,
+        help="archive: move entries older than this many days",
+    )
+    parser.add_argument(
+        "--format", choices=FORMATS, help="Defaults to csv for .csv files, else ndjson"
+    )
+    args = parser.parse_args()
+    if args.action != "archive" and args.path is None:
+        parser.error(f"{args.action} needs a path")
+
+    if args.database:
+        db.partitions.attach(args.guild, args.database)
+    db.partitions.get(args.guild)  # Migrates the file on open
+
+    started = time.perf_counter()
+    if args.action == "export":
+        count = DB.export_reputation(args.guild, args.path, args.format)
+        print(f"Exported {count} entries to {args.path}")
+    elif args.action == "import":
+        count, skipped = DB.import_reputation(args.guild, args.path, args.format)
+        print(f"Imported {count} entries, skipped {skipped} already present")
+    elif args.action == "backup":
+        count = DB.backup_database(args.guild, args.path)
+        print(f"Wrote a {count / 1_000_000:.1f}MB snapshot to {args.path}")
+    else:
+        count, freed = DB.archive_reputation(args.guild, args.days)
+        print(f"Archived {count} entries, freed {freed} database pages")
+
+    elapsed = time.perf_counter() - started
+    if args.action != "backup" and elapsed > 0:
+        print(f"{elapsed:.2f}s, {count / elapsed:,.0f} rows/s")
+
+    db.partitions.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+import csv
+import itertools
+import json
+import os
+import sqlite3
+
+import archive
+
+FORMATS = ("ndjson", "csv")
+COLUMNS = ("id", "target_user_id", "author_user_id", "point_value", "reason", "created_at")
+EXPORT_CHUNK_ROWS = 5000  # Rows held in memory at once while exporting
+IMPORT_BATCH_ROWS = 5000  # Rows per write transaction while importing
+
+EXPORT_SQL = f"SELECT {', '.join(COLUMNS)} FROM reputation ORDER BY id"
+# Exports from before entries were timestamped count from the import
+IMPORT_SQL = """
+    INSERT INTO reputation (
+        id, target_user_id, author_user_id, point_value, reason, created_at
+    )
+    VALUES (
+        :id, :target_user_id, :author_user_id, :point_value, :reason,
+        COALESCE(:created_at, (julianday('now') - 2440587.5) * 86400.0)
+    )
+"""
+EXISTING_IDS_SQL = (
+    "SELECT id FROM reputation WHERE id IN (SELECT value FROM json_each(?))"
+)
+NEXT_ID_SQL = "SELECT COALESCE(MAX(id), 0) + 1 FROM reputation"
+# While this row exists the FTS insert trigger stands down (see migration 8).
+# It is added and removed inside the batch transaction, so nobody else sees it.
+DEFER_FTS_SQL = "INSERT INTO settings (key, value) VALUES ('defer_fts', 1)"
+RESUME_FTS_SQL = "DELETE FROM settings WHERE key = 'defer_fts'"
+INDEX_FTS_SQL = """
+    INSERT INTO reputation_fts (rowid, reason)
+    SELECT id, reason FROM reputation
+    WHERE id IN (SELECT value FROM json_each(?))
+"""
+
+
+def format_for(path: str) -> str:
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+def export_reputation(connection: sqlite3.Connection, file, fmt: str) -> int:
+    # Streams every entry to file, archived ones first. Both reads step in
+    # chunks inside one read transaction, so the output is a consistent
+    # snapshot without ever loading the table.
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {FORMATS}")
+
+    if fmt == "csv":
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS)
+
+    def write_rows(rows):
+        if fmt == "csv":
+            writer.writerows(rows)
+        else:
+            file.writelines(
+                json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + "\n"
+                for row in rows
+            )
+
+    count = 0
+    connection.execute("BEGIN")
+    try:
+        archived = archive.iter_entries(connection)
+        while rows := list(itertools.islice(archived, EXPORT_CHUNK_ROWS)):
+            write_rows(rows)
+            count += len(rows)
+
+        cursor = connection.execute(EXPORT_SQL)
+        while rows := cursor.fetchmany(EXPORT_CHUNK_ROWS):
+            write_rows(rows)
+            count += len(rows)
+    finally:
+        connection.execute("COMMIT")
+    return count
+
+
+def read_rows(file, fmt: str):
+    # Yields one parameter dict per entry, raising ValueError on bad input
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {FORMATS}")
+
+    if fmt == "csv":
+        records = enumerate(csv.DictReader(file), start=2)
+    else:
+        records = (
+            (line_number, json.loads(line))
+            for line_number, line in enumerate(file, start=1)
+            if line.strip()
+        )
+
+    for line_number, record in records:
+        try:
+            yield {
+                "id": _optional(record.get("id"), int),
+                "target_user_id": int(record["target_user_id"]),
+                "author_user_id": int(record["author_user_id"]),
+                "point_value": int(record["point_value"]),
+                "reason": record.get("reason") or "",
+                "created_at": _optional(record.get("created_at"), float),
+            }
+        except (KeyError, TypeError, ValueError) as error:
+            raise ValueError(f"Line {line_number}: {error!r}") from error
+
+
+def _optional(value, convert):
+    # CSV has no null, an empty field means missing
+    if value is None or value == "":
+        return None
+    return convert(value)
+
+
+def import_reputation(write, file, fmt: str) -> tuple[int, int]:
+    # write is a context manager factory handing out the writer connection
+    # (ConnectionPool.write). Every batch is its own short transaction so other
+    # writes get in between. Returns (inserted, skipped).
+    inserted = 0
+    skipped = 0
+    batch = []
+    for row in read_rows(file, fmt):
+        batch.append(row)
+        if len(batch) >= IMPORT_BATCH_ROWS:
+            added = _insert_batch(write, batch)
+            inserted += added
+            skipped += len(batch) - added
+            batch = []
+
+    if batch:
+        added = _insert_batch(write, batch)
+        inserted += added
+        skipped += len(batch) - added
+    return inserted, skipped
+
+
+def _insert_batch(write, batch) -> int:
+    # Rows whose id is already taken (in the table, the archive or earlier in
+    # the batch) are skipped, so re-running an import is safe. Rows without an
+    # id get the next free ones. Returns how many were inserted.
+    with write() as connection:
+        archived_up_to = archive.archived_up_to(connection)
+        given_ids = [row["id"] for row in batch if row["id"] is not None]
+        taken = {
+            row[0]
+            for row in connection.execute(EXISTING_IDS_SQL, (json.dumps(given_ids),))
+        }
+        next_id = max(
+            connection.execute(NEXT_ID_SQL).fetchone()[0],
+            max(given_ids, default=0) + 1,
+            archived_up_to + 1,
+        )
+
+        rows = []
+        for row in batch:
+            if row["id"] is None:
+                row["id"] = next_id
+                next_id += 1
+            elif row["id"] in taken or row["id"] <= archived_up_to:
+                continue
+            taken.add(row["id"])
+            rows.append(row)
+
+        connection.execute(DEFER_FTS_SQL)
+        connection.executemany(IMPORT_SQL, rows)
+        connection.execute(INDEX_FTS_SQL, (json.dumps([row["id"] for row in rows]),))
+        connection.execute(RESUME_FTS_SQL)
+        return len(rows)
+
+
+def backup(connection: sqlite3.Connection, path: str) -> int:
+    # Consistent copy of the whole database through the backup API, written
+    # next to path and renamed into place. In WAL mode the source only holds
+    # a read snapshot, so writers carry on while it copies. Returns the size.
+    partial_path = path + ".partial"
+    target = sqlite3.connect(partial_path)
+    try:
+        connection.backup(target)
+    finally:
+        target.close()
+
+    os.replace(partial_path, path)
+    return os.path.getsize(path)